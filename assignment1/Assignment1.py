@@ -3,52 +3,301 @@ Paul Fitch
 Homework 1
 This python program is used to manipulate aws s3 buckets
 """
+import argparse
 import datetime
+import hashlib
+import itertools
+import json
 import logging
+import os
 import random
 import re
 import sys
-import boto3
-from botocore.exceptions import ClientError
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# the shared helpers live in the common package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cli import add_batch_command, run_cli  # noqa: E402
+from common.batching import bounded_map, iter_batches  # noqa: E402
+from common.cache import TTLCache  # noqa: E402
+from common.clients import add_client_options, client_error, get_client  # noqa: E402
+from common.event_log import configure_logging  # noqa: E402
 
-# logger configuration to write  messages to event_log.txt
-logging.basicConfig(filename="./event_log.txt",
-                    format="%(asctime)s %(levelname)s : %(message)s",
-                    datefmt="%Y-%m-%d %H:%M",
-                    filemode="w",
-                    level=logging.INFO)
 
+# log messages are written to event_log.txt by a background thread
+configure_logging()
 
-def log_message(message=None):
+
+def log_message(message=None, **fields):
     """
     This function utilizes the logger to log messages
     param message: message to be logged
+    param fields: extra values stored with the message, e.g. duration or bytes
     """
     if message is not None:
-        logging.info(message)
+        logging.info(message, extra=fields, stacklevel=2)
         print("\n")
         print("\n", message)
         print("\n")
 
 
+def get_s3_client(region=None):
+    """
+    This is a general function that returns the shared s3 client for a region
+    The client comes from common.clients, so it is created once and shared by
+    every command and worker thread in the process
+    param region: region name, None uses the configured default
+    return: boto3 s3 client object
+    """
+    return get_client("s3", region)
+
+
+# list_objects_v2 returns at most 1000 keys per call
+DEFAULT_PAGE_SIZE = 1000
+
+
+def iter_buckets(s3_client, prefix=None):
+    """
+    This is a general function that lazily yields bucket names
+    ListBuckets is followed through its continuation tokens so every bucket is seen
+    reference:
+    https://docs.aws.amazon.com/AmazonS3/latest/API/API_ListBuckets.html
+    param s3_client: boto s3 client object
+    param prefix: only yield buckets whose names start with this prefix
+    return: generator of bucket names
+    """
+    request = {}
+    if prefix:
+        request["Prefix"] = prefix
+    while True:
+        response = s3_client.list_buckets(**request)
+        for bucket in response.get("Buckets", []):
+            yield bucket["Name"]
+        token = response.get("ContinuationToken")
+        if not token:
+            return
+        request["ContinuationToken"] = token
+
+
+def iter_object_pages(s3_client, bucket_name, prefix="", delimiter=None,
+                      page_size=DEFAULT_PAGE_SIZE, continuation_token=None):
+    """
+    This is a general function that lazily yields list_objects_v2 pages
+    Only one page is requested at a time, so callers can act on the first page
+    before the rest of the bucket has been listed
+    reference:
+    https://docs.aws.amazon.com/AmazonS3/latest/API/API_ListObjectsV2.html
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket to list
+    param prefix: only list keys starting with this prefix
+    param delimiter: group keys sharing a prefix up to this character
+    param page_size: maximum number of keys requested per call (1 - 1000)
+    param continuation_token: resume a listing after the page that returned this token
+    return: generator of list_objects_v2 response pages
+    """
+    request = {"Bucket": bucket_name,
+               "MaxKeys": max(1, min(int(page_size), DEFAULT_PAGE_SIZE))}
+    if continuation_token:
+        request["ContinuationToken"] = continuation_token
+    if prefix:
+        request["Prefix"] = prefix
+    if delimiter:
+        request["Delimiter"] = delimiter
+    while True:
+        page = s3_client.list_objects_v2(**request)
+        yield page
+        if not page.get("IsTruncated"):
+            return
+        request["ContinuationToken"] = page["NextContinuationToken"]
+
+
+def iter_bucket_objects(s3_client, bucket_name, prefix="", delimiter=None,
+                        page_size=DEFAULT_PAGE_SIZE, continuation_token=None):
+    """
+    This is a general function that lazily yields every object in a bucket
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket to list
+    param prefix: only yield keys starting with this prefix
+    param delimiter: stop keys at this character, see iter_common_prefixes
+    param page_size: maximum number of keys requested per call
+    param continuation_token: resume a listing after the page that returned this token
+    return: generator of object dictionaries (Key, Size, ETag, LastModified)
+    """
+    for page in iter_object_pages(s3_client, bucket_name, prefix,
+                                  delimiter, page_size, continuation_token):
+        yield from page.get("Contents", [])
+
+
+def iter_common_prefixes(s3_client, bucket_name, prefix="", delimiter="/",
+                         page_size=DEFAULT_PAGE_SIZE):
+    """
+    This is a general function that lazily yields the "folders" in a bucket
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket to list
+    param prefix: only yield prefixes below this prefix
+    param delimiter: character separating "folders" in keys
+    param page_size: maximum number of keys requested per call
+    return: generator of common prefix strings
+    """
+    for page in iter_object_pages(s3_client, bucket_name, prefix,
+                                  delimiter, page_size):
+        for common_prefix in page.get("CommonPrefixes", []):
+            yield common_prefix["Prefix"]
+
+
+class ListingCache(TTLCache):
+    """
+    Least recently used cache of bucket lists, object listings and object metadata
+    Entries expire after ttl seconds and are dropped as soon as this program
+    changes a bucket, so menu selections and batch commands can reuse listings
+    """
+
+    def __init__(self, max_entries=128, ttl=300, max_listing_keys=100000):
+        super().__init__(max_entries, ttl)
+        self.max_listing_keys = max_listing_keys
+
+    def invalidate_bucket_list(self):
+        """
+        drops the cached bucket list after a bucket is created or deleted
+        """
+        self.discard(("buckets",))
+
+    def invalidate_bucket(self, bucket_name):
+        """
+        drops every listing and object entry for a bucket after it is changed
+        param bucket_name: name of the changed bucket
+        """
+        with self.lock:
+            for key in [key for key in self.entries
+                        if len(key) > 1 and key[1] == bucket_name]:
+                del self.entries[key]
+
+
+LISTING_CACHE = ListingCache()
+
+
+def cached_bucket_objects(s3_client, bucket_name, prefix="",
+                          page_size=DEFAULT_PAGE_SIZE):
+    """
+    This is a general function that yields every object in a bucket through LISTING_CACHE
+    Pages already listed are served from the cache; a listing that was stopped
+    early is resumed from its continuation token and the new pages are added.
+    Listings larger than max_listing_keys are not kept.
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket to list
+    param prefix: only yield keys starting with this prefix
+    param page_size: maximum number of keys requested per call
+    return: generator of object dictionaries (Key, Size, ETag, LastModified)
+    """
+    cache_key = ("objects", bucket_name, prefix)
+    cached = LISTING_CACHE.get(cache_key)
+    if cached is None:
+        listing = {"Objects": [], "NextToken": None, "Complete": False}
+        LISTING_CACHE.put(cache_key, listing)
+    else:
+        listing = cached[0]
+    position = 0
+    while True:
+        cached_objects = listing["Objects"]
+        if position < len(cached_objects):
+            yield from cached_objects[position:]
+            position = len(cached_objects)
+            continue
+        if listing["Complete"]:
+            return
+        token = listing["NextToken"]
+        page = next(iter_object_pages(s3_client, bucket_name, prefix,
+                                      page_size=page_size,
+                                      continuation_token=token))
+        page_objects = [{name: c_object.get(name) for name in
+                         ("Key", "Size", "ETag", "LastModified")}
+                        for c_object in page.get("Contents", [])]
+        with LISTING_CACHE.lock:
+            if listing["NextToken"] == token and not listing["Complete"]:
+                listing["Objects"].extend(page_objects)
+                listing["NextToken"] = page.get("NextContinuationToken")
+                listing["Complete"] = not page.get("IsTruncated")
+        if len(listing["Objects"]) > LISTING_CACHE.max_listing_keys:
+            LISTING_CACHE.discard(cache_key)
+            yield from page_objects
+            if page.get("IsTruncated"):
+                yield from iter_bucket_objects(
+                    s3_client, bucket_name, prefix, page_size=page_size,
+                    continuation_token=page["NextContinuationToken"])
+            return
+
+
+def get_object_metadata(s3_client, bucket_name, key):
+    """
+    This is a general function that returns an object's size and ETag through LISTING_CACHE
+    Expired entries are revalidated with a conditional head_object call, so an
+    unchanged object costs a 304 response instead of fresh metadata
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket holding the object
+    param key: key of the object
+    return: object dictionary (Key, Size, ETag, LastModified)
+    """
+    cache_key = ("head", bucket_name, key)
+    cached = LISTING_CACHE.get(cache_key, allow_expired=True)
+    request = {"Bucket": bucket_name, "Key": key}
+    if cached is not None:
+        metadata, expired = cached
+        if not expired:
+            return metadata
+        request["IfNoneMatch"] = metadata["ETag"]
+    try:
+        head = s3_client.head_object(**request)
+    except client_error() as error:
+        if cached is None or \
+                error.response.get("Error", {}).get("Code") not in ("304", "NotModified"):
+            raise
+        LISTING_CACHE.put(cache_key, cached[0])
+        return cached[0]
+    metadata = {"Key": key, "Size": head["ContentLength"], "ETag": head["ETag"],
+                "LastModified": head.get("LastModified")}
+    LISTING_CACHE.put(cache_key, metadata)
+    return metadata
+
+
+def bucket_is_empty(s3_client, bucket_name, prefix=""):
+    """
+    This is a general function that checks a bucket for objects
+    A cached listing answers when there is one, otherwise only a single key
+    is requested instead of listing the whole bucket
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket to check
+    param prefix: only check for keys starting with this prefix
+    return: true if the bucket holds no objects
+    """
+    cached = LISTING_CACHE.get(("objects", bucket_name, prefix))
+    if cached is not None and (cached[0]["Objects"] or cached[0]["Complete"]):
+        return not cached[0]["Objects"]
+    first_page = next(iter_object_pages(s3_client, bucket_name, prefix,
+                                        page_size=1))
+    return first_page["KeyCount"] == 0
+
+
 def get_bucket_list(s3_client):
     """
     This is a general function that returns a list containing all current buckets
+    The list is kept in LISTING_CACHE until it expires or a bucket is created or deleted
     reference:
     https://docs.aws.amazon.com/code-library/latest/ug/python_3_s3_code_examples.html#actions
     param s3_client: boto s3 client object
     return: list of current buckets
     """
-    buckets = []
+    cached = LISTING_CACHE.get(("buckets",))
+    if cached is not None:
+        return list(cached[0])
     try:
-        for bucket in s3_client.list_buckets()["Buckets"]:
-            buckets.append(bucket["Name"])
+        buckets = list(iter_buckets(s3_client))
+        LISTING_CACHE.put(("buckets",), buckets)
     except AttributeError as error:
         log_message(error)
         print("\nFatal error, closing application")
         sys.exit()
-    except ClientError as error:
+    except client_error() as error:
         log_message(error)
         return False
     return buckets
@@ -82,7 +331,7 @@ def select_bucket(s3_client):
                     break
                 else:
                     print("please select an appropriate number.\n")
-    except ClientError as error:
+    except client_error() as error:
         log_message(error)
     except AttributeError as error:
         log_message(error)
@@ -91,41 +340,79 @@ def select_bucket(s3_client):
     return selected_bucket
 
 
-def select_object(s3_client, bucket_name):
+def select_object(s3_client, bucket_name, prefix=None,
+                  page_size=DEFAULT_PAGE_SIZE):
     """
     This is a general function used to select objects in buckets
+    Objects are listed one page at a time; pressing enter shows the next page
+    When the prefix typed in matches nothing, the user is asked for another one
     reference:
     https://docs.aws.amazon.com/code-library/latest/ug/python_3_s3_code_examples.html#actions
+    param s3_client: boto s3 client object
+    param bucket_name: name of the bucket to select from
+    param prefix: key prefix to filter by, asked for when not supplied
+    param page_size: number of objects shown before asking for a selection
+    return: selected object dictionary or None if no object matches
     """
-    valid_object_index = []
-    selected_object = None
+    ask_prefix = prefix is None
     try:
-        bucket_objects = s3_client.list_objects_v2(Bucket=bucket_name)
-        if bucket_objects["KeyCount"] > 0:
-            index = 0
-            for c_object in bucket_objects["Contents"]:
-                print(f"{index}.{c_object['Key']}")
-                valid_object_index.append(index)
-                index += 1
-            while selected_object not in valid_object_index:
-                try:
-                    selected_object = int(
-                        input("Please select the object number: "))
-                except ValueError:
-                    print("Invalid selection. Please try again.\n")
-                if selected_object in valid_object_index:
-                    selected_object = bucket_objects["Contents"][int(
-                        selected_object)]
-                    break
-                else:
-                    print("please select an appropriate number.\n")
-    except ClientError as error:
+        while True:
+            if ask_prefix:
+                prefix = input("Enter a key prefix to filter by (blank for all): ")
+            bucket_objects = cached_bucket_objects(s3_client, bucket_name,
+                                                   prefix=prefix, page_size=page_size)
+            selected_object, matched = choose_listed_object(bucket_objects, page_size)
+            if matched or not ask_prefix or not prefix:
+                return selected_object
+            print(f"No objects in {bucket_name} start with {prefix}. Please try again.\n")
+    except client_error() as error:
         log_message(error)
     except AttributeError as error:
         log_message(error)
         print("\nFatal Error. Closing application")
         sys.exit()
-    return selected_object
+    return None
+
+
+def choose_listed_object(bucket_objects, page_size=DEFAULT_PAGE_SIZE):
+    """
+    This function lets the user pick one object from a listing, a page at a time
+    param bucket_objects: iterator of object dictionaries
+    param page_size: number of objects shown before asking for a selection
+    return: (selected object dictionary or None, true if the listing had objects)
+    """
+    shown_objects = []
+    selected_object = None
+    exhausted = False
+    show_more = True
+    while selected_object is None:
+        if show_more and not exhausted:
+            page = list(itertools.islice(bucket_objects, page_size))
+            exhausted = len(page) < page_size
+            for c_object in page:
+                print(f"{len(shown_objects)}.{c_object['Key']}")
+                shown_objects.append(c_object)
+        show_more = False
+        if len(shown_objects) == 0:
+            break
+        if exhausted:
+            choice = input("Please select the object number: ")
+        else:
+            choice = input(
+                "Please select the object number (enter for more): ")
+            if choice == "":
+                show_more = True
+                continue
+        try:
+            index = int(choice)
+        except ValueError:
+            print("Invalid selection. Please try again.\n")
+            continue
+        if 0 <= index < len(shown_objects):
+            selected_object = shown_objects[index]
+        else:
+            print("please select an appropriate number.\n")
+    return selected_object, len(shown_objects) > 0
 
 
 def handle_new_buckets(s3_client, region_override=None):
@@ -168,19 +455,19 @@ def create_new_bucket(bucket_name, s3_client, region_override=None):
     return: true if bucket created, false if bucket not created
     """
     try:
-        if region_override is not None:
-            region = region_override
-        elif region_override is None:
+        if region_override is None:
             s3_client.create_bucket(Bucket=bucket_name)
         else:
-            s3_client = boto3.client("s3", region_name=region_override)
+            s3_client = get_s3_client(region_override)
             s3_client.create_bucket(Bucket=bucket_name,
-                                    CreateBucketConfiguration={"LocationConstraint": region})
+                                    CreateBucketConfiguration={
+                                        "LocationConstraint": region_override})
+        LISTING_CACHE.invalidate_bucket_list()
     except AttributeError as error:
         log_message(error)
         print("\nFatal error, closing application")
         sys.exit()
-    except ClientError as error:
+    except client_error() as error:
         log_message(error)
         return False
     return True
@@ -198,18 +485,160 @@ def handle_add_to_bucket(s3_client):
         log_message(f"hello.txt file uploaded to {destination}")
 
 
-def place_in_bucket(s3_client, destination, obj_name, placed_object):
+# multipart limits from the S3 documentation: parts are 5 MiB - 5 GiB, at most 10000 parts
+MEGABYTE = 1024 * 1024
+MIN_PART_SIZE = 5 * MEGABYTE
+MAX_PARTS = 10000
+DEFAULT_PART_SIZE = 16 * MEGABYTE
+MULTIPART_THRESHOLD = 64 * MEGABYTE
+DEFAULT_TRANSFER_WORKERS = 8
+# copy_object only accepts sources up to 5 GiB; larger copies have to be multipart
+MULTIPART_COPY_THRESHOLD = 1024 * MEGABYTE
+DEFAULT_COPY_PART_SIZE = 256 * MEGABYTE
+# delete_objects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+# sync keeps its manifest inside the synced directory; the file itself is never uploaded
+SYNC_MANIFEST_NAME = ".s3sync-manifest.json"
+
+
+def format_throughput(byte_count, seconds):
+    """
+    This is a general function that formats a transfer rate for logging
+    param byte_count: number of bytes transferred
+    param seconds: time the transfer took
+    return: transfer rate in MB/s as a string
+    """
+    rate = byte_count / MEGABYTE / max(seconds, 1e-6)
+    return f"{rate:.2f} MB/s"
+
+
+def choose_part_size(file_size, part_size=DEFAULT_PART_SIZE):
+    """
+    This is a general function that picks a valid multipart part size
+    The requested size is raised when needed to stay inside the 5 MiB minimum
+    and the 10000 part maximum
+    param file_size: total size of the object in bytes
+    param part_size: requested part size in bytes
+    return: part size in bytes
+    """
+    part_size = max(int(part_size), MIN_PART_SIZE)
+    smallest_allowed = -(-file_size // MAX_PARTS)
+    return max(part_size, smallest_allowed)
+
+
+def upload_file_part(s3_client, destination, key, upload_id, file_path,
+                     part_number, offset, length):
+    """
+    This function is part of the algorithm used to upload large files
+    Each worker reads only its own part from disk, so at most one part per
+    worker is held in memory
+    param s3_client: boto3 s3 client object
+    param destination: name of the destination bucket
+    param key: key of the object being uploaded
+    param upload_id: id returned by create_multipart_upload
+    param file_path: path of the local file
+    param part_number: 1 based number of the part
+    param offset: byte offset of the part in the file
+    param length: number of bytes in the part
+    return: dictionary with the part number and ETag
+    """
+    with open(file_path, "rb") as source:
+        source.seek(offset)
+        body = source.read(length)
+    response = s3_client.upload_part(Bucket=destination, Key=key,
+                                     UploadId=upload_id, PartNumber=part_number,
+                                     Body=body)
+    return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+
+def multipart_upload(s3_client, destination, key, file_path,
+                     part_size=DEFAULT_PART_SIZE, workers=DEFAULT_TRANSFER_WORKERS):
+    """
+    This function is part of the algorithm used to upload large files
+    This function uses the boto3 multipart upload methods to send parts in parallel
+    The upload is aborted if any part fails so no orphaned parts are left behind
+    reference:
+    https://docs.aws.amazon.com/AmazonS3/latest/userguide/mpuoverview.html
+    param s3_client: boto3 s3 client object
+    param destination: name of the destination bucket
+    param key: key of the object being uploaded
+    param file_path: path of the local file
+    param part_size: size of each part in bytes
+    param workers: number of parts uploaded at the same time
+    return: number of bytes uploaded
+    """
+    file_size = os.path.getsize(file_path)
+    part_size = choose_part_size(file_size, part_size)
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=destination, Key=key)["UploadId"]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = []
+            for part_number, offset in enumerate(
+                    range(0, max(file_size, 1), part_size), start=1):
+                futures.append(executor.submit(
+                    upload_file_part, s3_client, destination, key, upload_id,
+                    file_path, part_number, offset,
+                    min(part_size, file_size - offset)))
+            try:
+                parts = [future.result() for future in as_completed(futures)]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        parts.sort(key=lambda part: part["PartNumber"])
+        s3_client.complete_multipart_upload(
+            Bucket=destination, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": parts})
+    except BaseException:
+        s3_client.abort_multipart_upload(
+            Bucket=destination, Key=key, UploadId=upload_id)
+        raise
+    return file_size
+
+
+def place_in_bucket(s3_client, destination, obj_name, placed_object, key=None,
+                    multipart=None, part_size=DEFAULT_PART_SIZE,
+                    workers=DEFAULT_TRANSFER_WORKERS):
     """
     This function is part of the algorithm used to put objects in buckets
     This function uses the boto3 put_object method to put objects in buckets
+    Files larger than MULTIPART_THRESHOLD are sent with multipart_upload
     reference:
     https://docs.aws.amazon.com/code-library/latest/ug/python_3_s3_code_examples.html#actions
     param s3_cleint: boto3 s3 client object
     param destination: name of the destination bucket
     param object: object to be placed in the destination bucket
+    param key: key of the new object, defaults to placed_object
+    param multipart: force (true) or disable (false) multipart, None picks by size
+    param part_size: size of each multipart part in bytes
+    param workers: number of parts uploaded at the same time
     """
     put_data = obj_name
+    key = key or placed_object
+    started = time.perf_counter()
     if isinstance(put_data, str):
+        try:
+            file_size = os.path.getsize(placed_object)
+        except OSError as error:
+            log_message(error)
+            return False
+        if multipart is None:
+            multipart = file_size >= MULTIPART_THRESHOLD
+        if multipart:
+            try:
+                multipart_upload(s3_client, destination, key,
+                                 placed_object, part_size, workers)
+                LISTING_CACHE.invalidate_bucket(destination)
+            except (client_error(), OSError) as error:
+                log_message(error)
+                return False
+            elapsed = time.perf_counter() - started
+            log_message(f"{placed_object} uploaded in parts at "
+                        f"{format_throughput(file_size, elapsed)}",
+                        operation="multipart_upload", bucket=destination,
+                        key=key, duration=elapsed, bytes=file_size)
+            return True
         try:
             put_data = open(placed_object, "rb")
         except FileNotFoundError as error:
@@ -218,10 +647,13 @@ def place_in_bucket(s3_client, destination, obj_name, placed_object):
         except IOError as error:
             log_message(error)
             return False
+    else:
+        file_size = len(put_data) if isinstance(put_data, bytes) else 0
     try:
         s3_client.put_object(Bucket=destination,
-                             Key=placed_object, Body=put_data)
-    except ClientError as error:
+                             Key=key, Body=put_data)
+        LISTING_CACHE.invalidate_bucket(destination)
+    except client_error() as error:
         log_message(error)
         return False
     except AttributeError as error:
@@ -231,6 +663,12 @@ def place_in_bucket(s3_client, destination, obj_name, placed_object):
     finally:
         if getattr(put_data, "close", None):
             put_data.close()
+    if file_size:
+        elapsed = time.perf_counter() - started
+        log_message(f"{placed_object} uploaded at "
+                    f"{format_throughput(file_size, elapsed)}",
+                    operation="put_object", bucket=destination, key=key,
+                    duration=elapsed, bytes=file_size)
     return True
 
 
@@ -250,36 +688,154 @@ def handle_delete_object_in_bucket(s3_client):
         if selected_object is not None:
             s3_client.delete_object(
                 Bucket=destination, Key=selected_object["Key"])
+            LISTING_CACHE.invalidate_bucket(destination)
             print(f"Deleted {selected_object['Key']} from{destination}\n")
             log_message(f"{selected_object['Key']} deleted from {destination}")
         else:
             print(f"The selected bucket {destination} is empty\n")
-    except ClientError as error:
+    except client_error() as error:
+        log_message(error)
+    except AttributeError as error:
+        log_message(error)
+        print("\nFatal error, closing application")
+        sys.exit()
+
+
+def delete_object_batch(s3_client, bucket_name, keys):
+    """
+    This function is part of the algorithm used to delete many objects
+    This function uses the boto3 delete_objects method to delete up to 1000 keys at once
+    reference:
+    https://docs.aws.amazon.com/AmazonS3/latest/API/API_DeleteObjects.html
+    param s3_client: boto3 s3 client object
+    param bucket_name: name of the bucket to delete from
+    param keys: list of keys to delete
+    return: list of error dictionaries for keys that were not deleted
+    """
+    response = s3_client.delete_objects(
+        Bucket=bucket_name,
+        Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True})
+    LISTING_CACHE.invalidate_bucket(bucket_name)
+    return response.get("Errors", [])
+
+
+def batch_delete(s3_client, bucket_name, prefix="",
+                 workers=DEFAULT_TRANSFER_WORKERS):
+    """
+    This function deletes every object under a prefix
+    The listing is streamed in batches of DELETE_BATCH_SIZE keys and the
+    batches are deleted on a worker pool while the listing continues
+    param s3_client: boto3 s3 client object
+    param bucket_name: name of the bucket to delete from
+    param prefix: only delete keys starting with this prefix
+    param workers: number of delete_objects requests sent at the same time
+    return: dictionary with deleted and failed key counts and elapsed seconds
+    """
+    keys = (c_object["Key"] for c_object in
+            iter_bucket_objects(s3_client, bucket_name, prefix))
+    stats = {"Deleted": 0, "Failed": 0}
+    started = time.perf_counter()
+    for batch, future in bounded_map(
+            lambda batch: delete_object_batch(s3_client, bucket_name, batch),
+            iter_batches(keys, DELETE_BATCH_SIZE), workers):
+        try:
+            errors = future.result()
+        except client_error() as error:
+            stats["Failed"] += len(batch)
+            log_message(error)
+            continue
+        for error in errors:
+            log_message(f"{error.get('Key')} not deleted: {error.get('Message')}")
+        stats["Failed"] += len(errors)
+        stats["Deleted"] += len(batch) - len(errors)
+    stats["Seconds"] = time.perf_counter() - started
+    return stats
+
+
+def empty_and_delete_bucket(s3_client, bucket_name,
+                            workers=DEFAULT_TRANSFER_WORKERS):
+    """
+    This function deletes every object in a bucket and then the bucket itself
+    param s3_client: boto3 s3 client object
+    param bucket_name: name of the bucket to delete
+    param workers: number of delete_objects requests sent at the same time
+    return: true if the bucket was deleted
+    """
+    stats = batch_delete(s3_client, bucket_name, workers=workers)
+    log_delete_stats(stats, bucket_name)
+    if stats["Failed"]:
+        print(f"{stats['Failed']} objects could not be deleted, "
+              f"{bucket_name} was not deleted\n")
+        return False
+    s3_client.delete_bucket(Bucket=bucket_name)
+    LISTING_CACHE.invalidate_bucket(bucket_name)
+    LISTING_CACHE.invalidate_bucket_list()
+    return True
+
+
+def log_delete_stats(stats, bucket_name):
+    """
+    This function logs the result of batch_delete
+    """
+    log_message(f"{stats['Deleted']} objects deleted from {bucket_name} "
+                f"({stats['Failed']} failed) at "
+                f"{stats['Deleted'] / max(stats['Seconds'], 1e-6):.1f} objects/s",
+                operation="batch_delete", bucket=bucket_name,
+                duration=stats["Seconds"], objects=stats["Deleted"],
+                failed=stats["Failed"])
+
+
+def handle_delete_prefix(s3_client):
+    """
+    This function handles deleting every object under a prefix
+    param s3_client: boto3 s3 client object
+    """
+    print("Select the bucket to delete from: ")
+    destination = select_bucket(s3_client)
+    if destination is None:
+        return
+    prefix = input("Enter the key prefix to delete (blank for all): ")
+    confirm = input(f"Delete every object under '{prefix}' in {destination}? (y/n): ")
+    if confirm.lower() != "y":
+        return
+    try:
+        stats = batch_delete(s3_client, destination, prefix)
+    except client_error() as error:
         log_message(error)
+        return
     except AttributeError as error:
         log_message(error)
         print("\nFatal error, closing application")
         sys.exit()
+    log_delete_stats(stats, destination)
 
 
 def handle_delete_bucket(s3_client):
     """
     This function is part of the algorithm used to delete buckets
     This function used the boto3 delete_bucket method to delete empty buckets
+    Buckets that still hold objects can be emptied with batch_delete first
     reference:
     https://docs.aws.amazon.com/code-library/latest/ug/python_3_s3_code_examples.html#actions
     param s3_client: boto3 s3 client object
     """
     selected_bucket = select_bucket(s3_client)
     try:
-        bucket_objects = s3_client.list_objects_v2(Bucket=selected_bucket)
-        if bucket_objects["KeyCount"] > 0:
+        if not bucket_is_empty(s3_client, selected_bucket):
             print(
                 f"{selected_bucket} is not empty. Buckets must be empty to be deleted\n")
+            confirm = input("Delete every object and then the bucket? (y/n): ")
+            if confirm.lower() != "y":
+                return
+            if not empty_and_delete_bucket(s3_client, selected_bucket):
+                return
+            print(f"Bucket {selected_bucket} deleted")
         else:
             s3_client.delete_bucket(Bucket=selected_bucket)
+            LISTING_CACHE.invalidate_bucket(selected_bucket)
+            LISTING_CACHE.invalidate_bucket_list()
             print(f"Bucket {selected_bucket} deleted")
-    except ClientError as error:
+    except client_error() as error:
         log_message(error)
     except AttributeError as error:
         log_message(error)
@@ -291,7 +847,7 @@ def handle_delete_bucket(s3_client):
 def handle_copy_to_bucket(s3_client):
     """
     This function handles copying objects from one bucket to another
-    This function uses the boto3 copy_object method to copy objects
+    This function uses copy_bucket_object to copy objects
     reference:
     https://docs.aws.amazon.com/code-library/latest/ug/python_3_s3_code_examples.html#actions
     param s3_client: boto3 s3 client object
@@ -299,12 +855,14 @@ def handle_copy_to_bucket(s3_client):
     print("Select bucket to copy from")
     origin_bucket = select_bucket(s3_client)
     try:
-        bucket_objects = s3_client.list_objects_v2(Bucket=origin_bucket)
-        if bucket_objects["KeyCount"] == 0:
+        if bucket_is_empty(s3_client, origin_bucket):
             print(f"{origin_bucket} is empty. Please select a bucket with objects\n")
         else:
             print("Select object to copy")
             selected_object = select_object(s3_client, origin_bucket)
+            if selected_object is None:
+                print(f"No objects in {origin_bucket} to copy\n")
+                return
             loop_control = True
             while loop_control:
                 destination = select_bucket(s3_client)
@@ -313,61 +871,566 @@ def handle_copy_to_bucket(s3_client):
                 else:
                     loop_control = False
             try:
-                copy = {"Bucket": origin_bucket,
-                        "Key": selected_object["Key"]}
-                s3_client.copy_object(
-                    CopySource=copy, Bucket=destination, Key=selected_object["Key"])
+                copy_bucket_object(s3_client, origin_bucket, selected_object,
+                                   destination)
                 print(
                     f"{selected_object['Key']} copied from {origin_bucket} to {destination}")
-            except ClientError as error:
+                log_message(
+                    f"{selected_object['Key']} copied from {origin_bucket} to {destination}")
+            except client_error() as error:
                 log_message(error)
-    except ClientError as error:
+    except client_error() as error:
+        log_message(error)
+    except AttributeError as error:
+        log_message(error)
+        print("\nFatal error, closing application")
+        sys.exit()
+
+
+def load_download_manifest(manifest_path, bucket_name, key, etag, size, range_size):
+    """
+    This function is part of the algorithm used to resume downloads
+    A manifest is only reused when it describes the same version of the object
+    param manifest_path: path of the sidecar manifest file
+    param bucket_name, key: location of the object being downloaded
+    param etag, size: version of the object being downloaded
+    param range_size: size of each byte range
+    return: set of completed range numbers, empty if there is nothing to resume
+    """
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return set()
+    expected = {"Bucket": bucket_name, "Key": key, "ETag": etag,
+                "Size": size, "RangeSize": range_size}
+    if any(manifest.get(name) != value for name, value in expected.items()):
+        return set()
+    return set(manifest.get("Completed", []))
+
+
+def save_download_manifest(manifest_path, bucket_name, key, etag, size,
+                           range_size, completed):
+    """
+    This function is part of the algorithm used to resume downloads
+    The manifest is written to a temporary file and renamed so a crash never
+    leaves a half written manifest behind
+    param manifest_path: path of the sidecar manifest file
+    param bucket_name, key: location of the object being downloaded
+    param etag, size: version of the object being downloaded
+    param range_size: size of each byte range
+    param completed: set of completed range numbers
+    """
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump({"Bucket": bucket_name, "Key": key, "ETag": etag,
+                   "Size": size, "RangeSize": range_size,
+                   "Completed": sorted(completed)}, manifest_file)
+    os.replace(temp_path, manifest_path)
+
+
+def download_range(s3_client, bucket_name, key, etag, file_path, start, end):
+    """
+    This function is part of the algorithm used to download large files
+    The response body is streamed straight to its offset in the destination file
+    param s3_client: boto3 s3 client object
+    param bucket_name, key: location of the object being downloaded
+    param etag: ETag the object must still have, so ranges of a replaced object are never mixed
+    param file_path: path of the preallocated destination file
+    param start, end: first and last byte of the range (inclusive)
+    return: number of bytes written
+    """
+    response = s3_client.get_object(Bucket=bucket_name, Key=key,
+                                    Range=f"bytes={start}-{end}", IfMatch=etag)
+    written = 0
+    with open(file_path, "r+b") as destination:
+        destination.seek(start)
+        for chunk in response["Body"].iter_chunks(MEGABYTE):
+            destination.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def ranged_download(s3_client, bucket_name, key, file_path,
+                    range_size=DEFAULT_PART_SIZE, workers=DEFAULT_TRANSFER_WORKERS,
+                    size=None, etag=None):
+    """
+    This function is part of the algorithm used to download large files
+    This function uses ranged get_object calls to fetch parts of an object in parallel
+    Each range is written into a preallocated file at its own offset, and finished
+    ranges are recorded in a sidecar manifest so an interrupted download can resume
+    reference:
+    https://docs.aws.amazon.com/AmazonS3/latest/API/API_GetObject.html
+    param s3_client: boto3 s3 client object
+    param bucket_name, key: location of the object to download
+    param file_path: path of the destination file
+    param range_size: size of each byte range
+    param workers: number of ranges downloaded at the same time
+    param size, etag: object size and ETag if already known from a listing
+    return: number of bytes downloaded by this call
+    """
+    if size is None or etag is None:
+        metadata = get_object_metadata(s3_client, bucket_name, key)
+        size, etag = metadata["Size"], metadata["ETag"]
+    range_size = max(int(range_size), 1)
+    manifest_path = file_path + ".manifest"
+    completed = load_download_manifest(manifest_path, bucket_name, key,
+                                       etag, size, range_size)
+    if not completed or not os.path.exists(file_path) \
+            or os.path.getsize(file_path) != size:
+        completed = set()
+        with open(file_path, "wb") as destination:
+            destination.truncate(size)
+    save_download_manifest(manifest_path, bucket_name, key, etag, size,
+                           range_size, completed)
+    downloaded = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+        for range_number, start in enumerate(range(0, size, range_size)):
+            if range_number in completed:
+                continue
+            end = min(start + range_size, size) - 1
+            futures[executor.submit(download_range, s3_client, bucket_name,
+                                    key, etag, file_path, start, end)] = range_number
+        try:
+            for future in as_completed(futures):
+                downloaded += future.result()
+                completed.add(futures[future])
+                save_download_manifest(manifest_path, bucket_name, key, etag,
+                                       size, range_size, completed)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    os.remove(manifest_path)
+    return downloaded
+
+
+# head_object fields copy_object keeps (MetadataDirective=COPY) that a
+# multipart copy has to pass to create_multipart_upload itself
+COPIED_HEAD_FIELDS = (
+    "ContentType", "CacheControl", "ContentDisposition", "ContentEncoding",
+    "ContentLanguage", "Expires", "WebsiteRedirectLocation", "Metadata",
+    "StorageClass", "ServerSideEncryption", "SSEKMSKeyId", "BucketKeyEnabled",
+    "ObjectLockMode", "ObjectLockRetainUntilDate", "ObjectLockLegalHoldStatus",
+)
+
+
+def copied_object_settings(s3_client, origin_bucket, source_object):
+    """
+    This function reads the settings of an object that a copy should keep
+    param s3_client: boto3 s3 client object
+    param origin_bucket: name of the bucket holding the object
+    param source_object: object dictionary from a listing (Key, Size, ETag)
+    return: dictionary of create_multipart_upload arguments
+    """
+    head = s3_client.head_object(Bucket=origin_bucket, Key=source_object["Key"],
+                                 IfMatch=source_object["ETag"])
+    return {field: head[field] for field in COPIED_HEAD_FIELDS if head.get(field)}
+
+
+def copy_object_multipart(s3_client, origin_bucket, source_object, destination,
+                          key=None, part_size=DEFAULT_COPY_PART_SIZE,
+                          workers=DEFAULT_TRANSFER_WORKERS):
+    """
+    This function is part of the algorithm used to copy large objects
+    This function uses the boto3 upload_part_copy method so S3 copies the bytes
+    itself and nothing passes through this host. Content headers, user metadata,
+    encryption and storage class are kept, as copy_object keeps them
+    reference:
+    https://docs.aws.amazon.com/AmazonS3/latest/API/API_UploadPartCopy.html
+    param s3_client: boto3 s3 client object
+    param origin_bucket: name of the bucket to copy from
+    param source_object: object dictionary from a listing (Key, Size, ETag)
+    param destination: name of the bucket to copy to
+    param key: key in the destination bucket, defaults to the source key
+    param part_size: size of each copied part in bytes
+    param workers: number of parts copied at the same time
+    """
+    key = key or source_object["Key"]
+    size = source_object["Size"]
+    part_size = choose_part_size(size, part_size)
+    copy_source = {"Bucket": origin_bucket, "Key": source_object["Key"]}
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=destination, Key=key,
+        **copied_object_settings(s3_client, origin_bucket, source_object))["UploadId"]
+
+    def copy_part(part):
+        part_number, start = part
+        end = min(start + part_size, size) - 1
+        response = s3_client.upload_part_copy(
+            Bucket=destination, Key=key, UploadId=upload_id,
+            PartNumber=part_number, CopySource=copy_source,
+            CopySourceRange=f"bytes={start}-{end}",
+            CopySourceIfMatch=source_object["ETag"])
+        return {"PartNumber": part_number,
+                "ETag": response["CopyPartResult"]["ETag"]}
+
+    try:
+        parts = [future.result() for _, future in bounded_map(
+            copy_part, enumerate(range(0, size, part_size), start=1), workers)]
+        parts.sort(key=lambda part: part["PartNumber"])
+        s3_client.complete_multipart_upload(
+            Bucket=destination, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": parts})
+    except BaseException:
+        s3_client.abort_multipart_upload(
+            Bucket=destination, Key=key, UploadId=upload_id)
+        raise
+
+
+def copy_bucket_object(s3_client, origin_bucket, source_object, destination,
+                       key=None):
+    """
+    This function is part of the algorithm used to copy objects between buckets
+    Objects up to MULTIPART_COPY_THRESHOLD use a single copy_object call,
+    larger ones use copy_object_multipart
+    param s3_client: boto3 s3 client object
+    param origin_bucket: name of the bucket to copy from
+    param source_object: object dictionary from a listing (Key, Size, ETag)
+    param destination: name of the bucket to copy to
+    param key: key in the destination bucket, defaults to the source key
+    return: number of bytes copied
+    """
+    if source_object["Size"] > MULTIPART_COPY_THRESHOLD:
+        copy_object_multipart(s3_client, origin_bucket, source_object,
+                              destination, key)
+    else:
+        s3_client.copy_object(
+            CopySource={"Bucket": origin_bucket, "Key": source_object["Key"]},
+            Bucket=destination, Key=key or source_object["Key"])
+    LISTING_CACHE.invalidate_bucket(destination)
+    return source_object["Size"]
+
+
+def bulk_copy(s3_client, origin_bucket, destination, prefix="",
+              destination_prefix=None, workers=DEFAULT_TRANSFER_WORKERS):
+    """
+    This function copies every object under a prefix to another bucket
+    The listing is streamed and copies run on a worker pool while it is read
+    param s3_client: boto3 s3 client object
+    param origin_bucket: name of the bucket to copy from
+    param destination: name of the bucket to copy to
+    param prefix: only copy keys starting with this prefix
+    param destination_prefix: replaces prefix in the destination keys, None keeps keys as they are
+    param workers: number of objects copied at the same time
+    return: dictionary with copied objects, bytes, failures and elapsed seconds
+    """
+    def copy_one(source_object):
+        key = source_object["Key"]
+        if destination_prefix is not None:
+            key = destination_prefix + key[len(prefix):]
+        return copy_bucket_object(s3_client, origin_bucket, source_object,
+                                  destination, key)
+
+    stats = {"Objects": 0, "Bytes": 0, "Failed": 0}
+    started = time.perf_counter()
+    for source_object, future in bounded_map(
+            copy_one, iter_bucket_objects(s3_client, origin_bucket, prefix),
+            workers):
+        try:
+            stats["Bytes"] += future.result()
+            stats["Objects"] += 1
+        except client_error() as error:
+            stats["Failed"] += 1
+            log_message(f"{source_object['Key']} not copied: {error}")
+    stats["Seconds"] = time.perf_counter() - started
+    return stats
+
+
+def log_copy_stats(stats, origin_bucket, destination):
+    """
+    This function logs the result of bulk_copy
+    """
+    seconds = max(stats["Seconds"], 1e-6)
+    log_message(f"{stats['Objects']} objects copied from {origin_bucket} to "
+                f"{destination} ({stats['Failed']} failed) at "
+                f"{stats['Objects'] / seconds:.1f} objects/s, "
+                f"{format_throughput(stats['Bytes'], seconds)}",
+                operation="bulk_copy", bucket=origin_bucket,
+                destination=destination, duration=stats["Seconds"],
+                objects=stats["Objects"], bytes=stats["Bytes"],
+                failed=stats["Failed"])
+
+
+def handle_bulk_copy(s3_client):
+    """
+    This function handles copying every object under a prefix to another bucket
+    param s3_client: boto3 s3 client object
+    """
+    print("Select bucket to copy from")
+    origin_bucket = select_bucket(s3_client)
+    if origin_bucket is None:
+        return
+    prefix = input("Enter the key prefix to copy (blank for all): ")
+    print("Select bucket to copy to")
+    destination = select_bucket(s3_client)
+    if destination == origin_bucket:
+        print("You cannot copy to and from the origin bucket\n")
+        return
+    try:
+        stats = bulk_copy(s3_client, origin_bucket, destination, prefix)
+    except client_error() as error:
         log_message(error)
+        return
     except AttributeError as error:
         log_message(error)
         print("\nFatal error, closing application")
         sys.exit()
-    log_message(
-        f"{selected_object['Key']} copied from {origin_bucket} to {destination}")
+    log_copy_stats(stats, origin_bucket, destination)
+
+
+def log_download(bucket_name, key, downloaded, seconds):
+    """
+    This function logs the result of ranged_download
+    """
+    log_message(f"{key} downloaded at {format_throughput(downloaded, seconds)}",
+                operation="ranged_download", bucket=bucket_name, key=key,
+                duration=seconds, bytes=downloaded)
 
 
-def handle_download(s3_client):
+def handle_download(s3_client, file_path="downloaded_file"):
     """
     This function handles downloading bucket objects
-    This function uses the boto3 download_file method to download files from buckets
+    This function uses ranged_download to download files from buckets
     reference:
     https://docs.aws.amazon.com/code-library/latest/ug/python_3_s3_code_examples.html#actions
     param s3_client: boto3 s3 client object
+    param file_path: path the object is downloaded to
     """
     print("Select bucket to download from: ")
     origin_bucket = select_bucket(s3_client)
     try:
-        bucket_objects = s3_client.list_objects_v2(Bucket=origin_bucket)
-        if bucket_objects["KeyCount"] == 0:
+        if bucket_is_empty(s3_client, origin_bucket):
             print(f"{origin_bucket} is empty")
         else:
             selected_object = select_object(s3_client, origin_bucket)
+            if selected_object is None:
+                print(f"No objects in {origin_bucket} to download\n")
+                return
             try:
-                s3_client.download_file(
-                    origin_bucket, selected_object["Key"], "downloaded_file")
+                started = time.perf_counter()
+                downloaded = ranged_download(
+                    s3_client, origin_bucket, selected_object["Key"], file_path,
+                    size=selected_object["Size"], etag=selected_object["ETag"])
                 print(f"{selected_object['Key']} has been downloaded\n")
-            except ClientError as error:
+                log_download(origin_bucket, selected_object["Key"], downloaded,
+                             time.perf_counter() - started)
+            except client_error() as error:
                 log_message(error)
-    except ClientError as error:
+            except OSError as error:
+                log_message(error)
+    except client_error() as error:
         log_message(error)
     except AttributeError as error:
         log_message(error)
         print("\nFatal error, closing application")
         sys.exit()
-    log_message(f"{selected_object['Key']} has been downloaded")
 
 
-def main():
+def hash_file(file_path):
+    """
+    This is a general function that hashes a file's contents
+    param file_path: path of the file
+    return: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source:
+        for chunk in iter(lambda: source.read(MEGABYTE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload_file(s3_client, destination, key, file_path, file_size):
     """
-    main function creating menu and calling necessary functions 
+    This function is part of the algorithm used to sync directories
+    Uploads one file without logging, picking multipart by size
+    param s3_client: boto3 s3 client object
+    param destination: name of the destination bucket
+    param key: key of the new object
+    param file_path: path of the local file
+    param file_size: size of the file in bytes
+    """
+    if file_size >= MULTIPART_THRESHOLD:
+        multipart_upload(s3_client, destination, key, file_path)
+    else:
+        with open(file_path, "rb") as put_data:
+            s3_client.put_object(Bucket=destination, Key=key, Body=put_data)
+
+
+def iter_local_files(directory):
+    """
+    This function is part of the algorithm used to sync directories
+    param directory: directory to walk
+    return: generator of (relative path with / separators, size, mtime in ns)
+    """
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            file_path = os.path.join(root, file_name)
+            relative_path = os.path.relpath(file_path, directory).replace(os.sep, "/")
+            if relative_path == SYNC_MANIFEST_NAME:
+                continue
+            file_stat = os.stat(file_path)
+            yield relative_path, file_stat.st_size, file_stat.st_mtime_ns
+
+
+def load_sync_manifest(directory, destination, prefix):
+    """
+    This function is part of the algorithm used to sync directories
+    param directory: synced directory holding the manifest
+    param destination, prefix: bucket and key prefix the directory is synced to
+    return: (whole manifest, entries for this destination)
+    """
+    try:
+        with open(os.path.join(directory, SYNC_MANIFEST_NAME),
+                  encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        manifest = {}
+    return manifest, manifest.setdefault(f"{destination}/{prefix}", {})
+
+
+def save_sync_manifest(directory, manifest):
+    """
+    This function is part of the algorithm used to sync directories
+    param directory: synced directory holding the manifest
+    param manifest: whole manifest
+    """
+    manifest_path = os.path.join(directory, SYNC_MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def sync_directory(s3_client, directory, destination, prefix="",
+                   delete_orphans=False, workers=DEFAULT_TRANSFER_WORKERS):
+    """
+    This function uploads new and changed files from a local directory to a bucket
+    A manifest of size, mtime and sha256 is kept in the directory. Files whose
+    size and mtime match are skipped without reading them, and touched files
+    whose hash still matches are not uploaded again. Hashing and uploading run
+    on a worker pool.
+    param s3_client: boto3 s3 client object
+    param directory: local directory to sync
+    param destination: name of the destination bucket
+    param prefix: key prefix the directory is synced to
+    param delete_orphans: delete objects under the prefix with no local file
+    param workers: number of files hashed and uploaded at the same time
+    return: dictionary with uploaded, unchanged, deleted and failed counts, bytes and seconds
+    """
+    manifest, entries = load_sync_manifest(directory, destination, prefix)
+    stats = {"Uploaded": 0, "Unchanged": 0, "Deleted": 0, "Failed": 0, "Bytes": 0}
+    started = time.perf_counter()
+    local_paths = set()
+
+    def changed_files():
+        for relative_path, size, mtime in iter_local_files(directory):
+            local_paths.add(relative_path)
+            entry = entries.get(relative_path)
+            if entry and entry["Size"] == size and entry["MTime"] == mtime:
+                stats["Unchanged"] += 1
+                continue
+            yield relative_path, size, mtime
+
+    def sync_file(local_file):
+        relative_path, size, mtime = local_file
+        file_hash = hash_file(os.path.join(directory, relative_path))
+        entry = entries.get(relative_path)
+        uploaded = not entry or entry["SHA256"] != file_hash
+        if uploaded:
+            upload_file(s3_client, destination, prefix + relative_path,
+                        os.path.join(directory, relative_path), size)
+        return uploaded, {"Size": size, "MTime": mtime, "SHA256": file_hash}
+
+    try:
+        for local_file, future in bounded_map(sync_file, changed_files(), workers):
+            try:
+                uploaded, entry = future.result()
+            except (client_error(), OSError) as error:
+                stats["Failed"] += 1
+                log_message(f"{local_file[0]} not synced: {error}")
+                continue
+            entries[local_file[0]] = entry
+            if uploaded:
+                stats["Uploaded"] += 1
+                stats["Bytes"] += local_file[1]
+            else:
+                stats["Unchanged"] += 1
+    finally:
+        LISTING_CACHE.invalidate_bucket(destination)
+        save_sync_manifest(directory, manifest)
+
+    for relative_path in set(entries) - local_paths:
+        del entries[relative_path]
+    if delete_orphans:
+        orphans = (c_object["Key"] for c_object in
+                   iter_bucket_objects(s3_client, destination, prefix)
+                   if c_object["Key"][len(prefix):] not in local_paths)
+        for batch, future in bounded_map(
+                lambda batch: delete_object_batch(s3_client, destination, batch),
+                iter_batches(orphans, DELETE_BATCH_SIZE), workers):
+            try:
+                errors = future.result()
+            except client_error() as error:
+                stats["Failed"] += len(batch)
+                log_message(error)
+                continue
+            stats["Failed"] += len(errors)
+            stats["Deleted"] += len(batch) - len(errors)
+    save_sync_manifest(directory, manifest)
+    stats["Seconds"] = time.perf_counter() - started
+    return stats
+
+
+def log_sync_stats(stats, directory, destination, prefix):
+    """
+    This function logs the result of sync_directory
+    """
+    log_message(f"{directory} synced to {destination}/{prefix}: "
+                f"{stats['Uploaded']} uploaded, {stats['Unchanged']} unchanged, "
+                f"{stats['Deleted']} deleted, {stats['Failed']} failed at "
+                f"{format_throughput(stats['Bytes'], stats['Seconds'])}",
+                operation="sync_directory", bucket=destination, prefix=prefix,
+                duration=stats["Seconds"], bytes=stats["Bytes"],
+                uploaded=stats["Uploaded"], deleted=stats["Deleted"],
+                failed=stats["Failed"])
+
+
+def handle_sync_directory(s3_client):
+    """
+    This function handles syncing a local directory to a bucket
+    param s3_client: boto3 s3 client object
+    """
+    directory = input("Enter the local directory to sync: ")
+    if not os.path.isdir(directory):
+        print(f"{directory} is not a directory\n")
+        return
+    print("Select the bucket to sync to")
+    destination = select_bucket(s3_client)
+    if destination is None:
+        return
+    prefix = input("Enter the key prefix to sync to (blank for none): ")
+    delete_orphans = input(
+        "Delete objects under the prefix that have no local file? (y/n): ")
+    try:
+        stats = sync_directory(s3_client, directory, destination, prefix,
+                               delete_orphans.lower() == "y")
+    except client_error() as error:
+        log_message(error)
+        return
+    except AttributeError as error:
+        log_message(error)
+        print("\nFatal error, closing application")
+        sys.exit()
+    log_sync_stats(stats, directory, destination, prefix)
+
+
+def run_menu(s3_client):
+    """
+    menu loop creating menu and calling necessary functions
     based on used input
+    param s3_client: boto3 s3 client object
     """
-    s3_client = boto3.client("s3")
     while True:
         print("Select a function from the options below\n")
         print("1. Create s3 bucket\n")
@@ -376,7 +1439,10 @@ def main():
         print("4. Delete bucket\n")
         print("5. Copy object from one bucket to another\n")
         print("6. Download object from bucket\n")
-        print("7. Exit program\n")
+        print("7. Copy all objects under a prefix to another bucket\n")
+        print("8. Delete all objects under a prefix\n")
+        print("9. Sync a local directory to a bucket\n")
+        print("10. Exit program\n")
 
         user_select = str(input("Select number from menu: "))
         if user_select == "1":
@@ -392,6 +1458,12 @@ def main():
         elif user_select == "6":
             handle_download(s3_client)
         elif user_select == "7":
+            handle_bulk_copy(s3_client)
+        elif user_select == "8":
+            handle_delete_prefix(s3_client)
+        elif user_select == "9":
+            handle_sync_directory(s3_client)
+        elif user_select == "10":
             date_time_now = datetime.datetime.now()
             date_time_format = date_time_now.strftime("%m/%d/%Y %H:%M")
             print("Exiting program. Goodbye!")
@@ -401,4 +1473,238 @@ def main():
             print("Plese use the numbers provided in the menu\n")
 
 
-main()
+def command_create_bucket(args):
+    """
+    create-bucket command: creates a bucket with the given name
+    """
+    if not create_new_bucket(args.bucket, get_s3_client(), args.region):
+        return False
+    log_message(f"New bucket named {args.bucket} created")
+    return True
+
+
+def command_put(args):
+    """
+    put command: uploads a local file to a bucket
+    """
+    return place_in_bucket(get_s3_client(), args.bucket, args.file, args.file,
+                           key=args.key, multipart=args.multipart,
+                           part_size=args.part_size * MEGABYTE,
+                           workers=args.workers)
+
+
+def command_delete_object(args):
+    """
+    delete-object command: deletes one object from a bucket
+    """
+    try:
+        get_s3_client().delete_object(Bucket=args.bucket, Key=args.key)
+        LISTING_CACHE.invalidate_bucket(args.bucket)
+    except client_error() as error:
+        log_message(error)
+        return False
+    log_message(f"{args.key} deleted from {args.bucket}")
+    return True
+
+
+def command_delete_bucket(args):
+    """
+    delete-bucket command: deletes a bucket, emptying it first with --force
+    """
+    s3_client = get_s3_client()
+    try:
+        if args.force:
+            if not empty_and_delete_bucket(s3_client, args.bucket, args.workers):
+                return False
+        else:
+            s3_client.delete_bucket(Bucket=args.bucket)
+            LISTING_CACHE.invalidate_bucket(args.bucket)
+            LISTING_CACHE.invalidate_bucket_list()
+    except client_error() as error:
+        log_message(error)
+        return False
+    log_message(f"Bucket {args.bucket} deleted")
+    return True
+
+
+def command_copy(args):
+    """
+    copy command: copies one object to another bucket
+    """
+    s3_client = get_s3_client()
+    try:
+        copy_bucket_object(s3_client, args.source,
+                           get_object_metadata(s3_client, args.source, args.key),
+                           args.destination, args.destination_key)
+    except client_error() as error:
+        log_message(error)
+        return False
+    log_message(f"{args.key} copied from {args.source} to {args.destination}")
+    return True
+
+
+def command_download(args):
+    """
+    download command: downloads one object with ranged_download
+    """
+    started = time.perf_counter()
+    try:
+        downloaded = ranged_download(get_s3_client(), args.bucket, args.key,
+                                     args.output, args.part_size * MEGABYTE,
+                                     args.workers)
+    except (client_error(), OSError) as error:
+        log_message(error)
+        return False
+    log_download(args.bucket, args.key, downloaded, time.perf_counter() - started)
+    return True
+
+
+def command_bulk_copy(args):
+    """
+    bulk-copy command: copies every object under a prefix to another bucket
+    """
+    stats = bulk_copy(get_s3_client(), args.source, args.destination,
+                      args.prefix, args.destination_prefix, args.workers)
+    log_copy_stats(stats, args.source, args.destination)
+    return stats["Failed"] == 0
+
+
+def command_delete_prefix(args):
+    """
+    delete-prefix command: deletes every object under a prefix
+    """
+    stats = batch_delete(get_s3_client(), args.bucket, args.prefix, args.workers)
+    log_delete_stats(stats, args.bucket)
+    return stats["Failed"] == 0
+
+
+def command_sync(args):
+    """
+    sync command: uploads new and changed files from a directory to a bucket
+    """
+    if not os.path.isdir(args.directory):
+        print(f"{args.directory} is not a directory", file=sys.stderr)
+        return False
+    stats = sync_directory(get_s3_client(), args.directory, args.bucket,
+                           args.prefix, args.delete, args.workers)
+    log_sync_stats(stats, args.directory, args.bucket, args.prefix)
+    return stats["Failed"] == 0
+
+
+def command_list(args):
+    """
+    list command: prints the key and size of every object under a prefix
+    """
+    for c_object in cached_bucket_objects(get_s3_client(), args.bucket,
+                                          args.prefix, page_size=args.page_size):
+        print(f"{c_object['Key']}\t{c_object['Size']}")
+    return True
+
+
+def build_parser():
+    """
+    This function builds the command line parser
+    Each menu item is a subcommand; running without arguments opens the menu
+    return: argparse parser
+    """
+    parser = argparse.ArgumentParser(
+        description="Manage s3 buckets. Run without arguments for the interactive menu.")
+    add_client_options(parser)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    command = subparsers.add_parser("create-bucket", help="create s3 bucket")
+    command.add_argument("bucket")
+    command.add_argument("--region")
+    command.set_defaults(func=command_create_bucket)
+
+    command = subparsers.add_parser("put", help="put an object in a bucket")
+    command.add_argument("bucket")
+    command.add_argument("file")
+    command.add_argument("--key", help="object key, defaults to the file path")
+    command.add_argument("--multipart", action=argparse.BooleanOptionalAction,
+                         help="force or disable multipart upload, picked by size by default")
+    command.add_argument("--part-size", type=int, default=DEFAULT_PART_SIZE // MEGABYTE,
+                         help="multipart part size in MB")
+    command.add_argument("--workers", type=int, default=DEFAULT_TRANSFER_WORKERS)
+    command.set_defaults(func=command_put)
+
+    command = subparsers.add_parser("delete-object", help="delete object in bucket")
+    command.add_argument("bucket")
+    command.add_argument("key")
+    command.set_defaults(func=command_delete_object)
+
+    command = subparsers.add_parser("delete-bucket", help="delete bucket")
+    command.add_argument("bucket")
+    command.add_argument("--force", action="store_true",
+                         help="delete every object in the bucket first")
+    command.add_argument("--workers", type=int, default=DEFAULT_TRANSFER_WORKERS)
+    command.set_defaults(func=command_delete_bucket)
+
+    command = subparsers.add_parser(
+        "copy", help="copy object from one bucket to another")
+    command.add_argument("source")
+    command.add_argument("key")
+    command.add_argument("destination")
+    command.add_argument("--destination-key")
+    command.set_defaults(func=command_copy)
+
+    command = subparsers.add_parser("download", help="download object from bucket")
+    command.add_argument("bucket")
+    command.add_argument("key")
+    command.add_argument("--output", default="downloaded_file")
+    command.add_argument("--part-size", type=int, default=DEFAULT_PART_SIZE // MEGABYTE,
+                         help="byte range size in MB")
+    command.add_argument("--workers", type=int, default=DEFAULT_TRANSFER_WORKERS)
+    command.set_defaults(func=command_download)
+
+    command = subparsers.add_parser(
+        "bulk-copy", help="copy all objects under a prefix to another bucket")
+    command.add_argument("source")
+    command.add_argument("destination")
+    command.add_argument("--prefix", default="")
+    command.add_argument("--destination-prefix")
+    command.add_argument("--workers", type=int, default=DEFAULT_TRANSFER_WORKERS)
+    command.set_defaults(func=command_bulk_copy)
+
+    command = subparsers.add_parser(
+        "delete-prefix", help="delete all objects under a prefix")
+    command.add_argument("bucket")
+    command.add_argument("--prefix", default="")
+    command.add_argument("--workers", type=int, default=DEFAULT_TRANSFER_WORKERS)
+    command.set_defaults(func=command_delete_prefix)
+
+    command = subparsers.add_parser(
+        "sync", help="sync a local directory to a bucket")
+    command.add_argument("directory")
+    command.add_argument("bucket")
+    command.add_argument("--prefix", default="")
+    command.add_argument("--delete", action="store_true",
+                         help="delete objects under the prefix that have no local file")
+    command.add_argument("--workers", type=int, default=DEFAULT_TRANSFER_WORKERS)
+    command.set_defaults(func=command_sync)
+
+    command = subparsers.add_parser("list", help="list objects in a bucket")
+    command.add_argument("bucket")
+    command.add_argument("--prefix", default="")
+    command.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    command.set_defaults(func=command_list)
+
+    add_batch_command(subparsers)
+    return parser
+
+
+def main(argv=None):
+    """
+    main function, opens the menu or runs the commands given on the command line
+    param argv: command line arguments, defaults to sys.argv
+    return: process exit code
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_menu(get_s3_client())
+        return 0
+    return run_cli(build_parser(), argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
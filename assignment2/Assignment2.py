@@ -1,26 +1,136 @@
+import argparse
+import atexit
+import bisect
+import csv
 import logging
-import boto3
-from boto3.dynamodb.conditions import Attr
 import json
+import os
+import re
+import sqlite3
+import sys
+import threading
 import time
 
-dynamo_db = boto3.resource('dynamodb')
-db_client = boto3.client('dynamodb', region_name = "us-east-1")
+# the shared helpers live in the common package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.batching import bounded_map, iter_batches, ordered_map  # noqa: E402
+from common.cache import TTLCache  # noqa: E402
+from common.cli import add_batch_command, run_cli  # noqa: E402
+from common.clients import add_client_options, get_client, get_resource  # noqa: E402
+from common.event_log import configure_logging  # noqa: E402
+from common.export import add_export_options, export_from_args, iter_table_items  # noqa: E402
+from common.tables import MISSING, set_table_status, table_status  # noqa: E402
+from common.throttle import (  # noqa: E402
+    PACED_CLIENT_SETTINGS, backoff_delay, item_write_units, write_scheduler)
 
-logging.basicConfig(filename="./event_log.txt",
-                    format="%(asctime)s %(levelname)s : %(message)s",
-                    datefmt="%Y-%m-%d %H:%M",
-                    filemode="w",
-                    level=logging.INFO)
+# log messages are written to event_log.txt by a background thread
+configure_logging()
+
+# batch_write_item accepts at most 25 put requests
+WRITE_BATCH_SIZE = 25
+DEFAULT_WRITERS = 4
+COURSE_FIELDS = ("Subject", "CatalogNbr", "Title", "Credits", "CourseId")
+# course titles rarely change; courses that were not found are remembered for
+# less time so newly added courses show up quickly
+TITLE_TTL = 24 * 60 * 60
+MISSING_TITLE_TTL = 5 * 60
+TITLE_CACHE = TTLCache(max_entries=4096, ttl=TITLE_TTL)
+TITLE_CACHE_FILES = []
+DEFAULT_LOOKUP_WORKERS = 16
+# "CMIS 242", "cmis242" and "CMIS-242" are all accepted in lookup files
+COURSE_PATTERN = re.compile(r"^\s*([A-Za-z]{4})[\s-]*(\d{3})\s*$")
+# global secondary index used to look courses up by subject and catalog number
+COURSE_INDEX = "SubjectCatalogNbrIndex"
+COURSE_INDEX_SCHEMA = {
+    'IndexName': COURSE_INDEX,
+    'KeySchema': [
+        {
+            'AttributeName': 'Subject',
+            'KeyType': 'HASH'
+        },
+        {
+            'AttributeName': 'CatalogNbr',
+            'KeyType': 'RANGE'
+        }
+    ],
+    'Projection': {
+        'ProjectionType': 'INCLUDE',
+        'NonKeyAttributes': ['Title', 'Credits']
+    },
+    'ProvisionedThroughput': {
+        'ReadCapacityUnits': 10,
+        'WriteCapacityUnits': 10
+    }
+}
+COURSE_INDEX_ATTRIBUTES = [
+    {
+        'AttributeName': 'Subject',
+        'AttributeType': 'S'
+    },
+    {
+        'AttributeName': 'CatalogNbr',
+        'AttributeType': 'S'
+    }
+]
+READ_CHUNK_SIZE = 64 * 1024
+# local sqlite copy of the Courses table used by --snapshot
+SNAPSHOT_FILES = []
+SNAPSHOT_STATE = threading.local()
+SNAPSHOT_ATTRIBUTES = ["CourseID", "Subject", "CatalogNbr", "Title", "Credits"]
+SEARCH_INDEX_FILE = "course_index.json"
+# index files used by this process, dropped with the default one when the catalog changes
+SEARCH_INDEX_FILES = []
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# "CMIS", "CMIS 2", "cmis 2xx" and "CMIS242" are course code searches
+COURSE_CODE_PREFIX = re.compile(r"^[A-Za-z]{4}(?:[\s-]*\d{0,3}[xX]*)?$")
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    CourseID INTEGER PRIMARY KEY,
+    Subject TEXT NOT NULL,
+    CatalogNbr TEXT NOT NULL,
+    Title TEXT NOT NULL,
+    Credits TEXT
+);
+CREATE INDEX IF NOT EXISTS courses_subject_catalog_nbr ON courses (Subject, CatalogNbr);
+CREATE INDEX IF NOT EXISTS courses_title ON courses (Title);
+CREATE TABLE IF NOT EXISTS snapshot_info (name TEXT PRIMARY KEY, value TEXT);
+"""
 
 
-def log_message(message=None):
+def log_message(message=None, **fields):
     """
     This function utilizes the logger to log messages
     param message: message to be logged
+    param fields: extra values stored with the message, e.g. duration or bytes
     """
     if message is not None:
-        logging.info(message)
+        logging.info(message, extra=fields, stacklevel=2)
+
+
+def get_dynamo_resource():
+    """
+    This function returns this thread's dynamodb resource from common.clients
+    return: boto3 dynamodb service resource
+    """
+    return get_resource('dynamodb')
+
+
+def get_write_resource():
+    """
+    This function returns this thread's dynamodb resource for paced writes
+    It retries throttled calls only once itself, so throttling reaches the
+    write scheduler, which lowers its rate
+    return: boto3 dynamodb service resource
+    """
+    return get_resource('dynamodb', **PACED_CLIENT_SETTINGS)
+
+
+def get_db_client():
+    """
+    This function returns the shared dynamodb client from common.clients
+    return: boto3 dynamodb client object
+    """
+    return get_client('dynamodb', "us-east-1")
 
 
 def delete_table(table_name):
@@ -31,28 +141,44 @@ def delete_table(table_name):
     if not table_exists(table_name):
         print(f"{table_name} table does not exist")
         return
-    db_client.delete_table(TableName=table_name)
-    time.sleep(10)
+    get_db_client().delete_table(TableName=table_name)
+    set_table_status(table_name, "DELETING")
+    if table_name == "Courses":
+        drop_search_index()
+        drop_title_cache()
+    wait_for_table(table_name, exists=False)
     print(f"{table_name} table deleted")
-    
+
+
+def wait_for_table(table_name, exists=True):
+    """
+    This function waits until a table is ACTIVE, or until it is gone
+    The dynamodb waiters poll describe_table instead of sleeping a fixed time
+    param table_name: name of table to wait for
+    param exists: wait for the table to exist (true) or to be deleted (false)
+    """
+    waiter_name = "table_exists" if exists else "table_not_exists"
+    get_dynamo_resource().meta.client.get_waiter(waiter_name).wait(
+        TableName=table_name, WaiterConfig={"Delay": 2, "MaxAttempts": 150})
+    set_table_status(table_name, "ACTIVE" if exists else MISSING)
+
+
 def table_exists(table_name):
     """
     This function checks if a table with a given name exists
+    A single describe_table call answers, and the answer is reused for the rest
+    of the process, see common.tables
     param table_name: name of table to be checked
     """
-    tables = []
-    for table in dynamo_db.tables.all():
-        tables.append(table.name)
-    if table_name in tables:
-        return True
-    return False
+    return table_status(get_dynamo_resource().meta.client, table_name) != MISSING
 
 
 def create_course_table():
     """
     This function creates the Courses table
+    with the Subject + CatalogNbr index used by get_title
     """
-    dynamo_db.create_table(
+    get_dynamo_resource().create_table(
         TableName="Courses",
         KeySchema=[
             {
@@ -65,7 +191,8 @@ def create_course_table():
                 'AttributeName': 'CourseID',
                 'AttributeType': 'N'
             }
-        ],
+        ] + COURSE_INDEX_ATTRIBUTES,
+        GlobalSecondaryIndexes=[COURSE_INDEX_SCHEMA],
          ProvisionedThroughput={
         'ReadCapacityUnits': 10,
         'WriteCapacityUnits': 10
@@ -73,6 +200,37 @@ def create_course_table():
     )
 
 
+def add_course_index():
+    """
+    This function adds the Subject + CatalogNbr index to a Courses table
+    created before the index existed; dynamodb backfills it in the background
+    """
+    get_db_client().update_table(
+        TableName="Courses",
+        AttributeDefinitions=COURSE_INDEX_ATTRIBUTES,
+        GlobalSecondaryIndexUpdates=[{"Create": COURSE_INDEX_SCHEMA}])
+    print(f"{COURSE_INDEX} is being built, lookups use it once it is ACTIVE")
+
+
+def course_item(data):
+    """
+    This function converts a course record to a Courses table item
+    param data: course record from the course data file
+    return: item dictionary
+    raises ValueError: if a field is missing or CourseId is not a whole number
+    """
+    missing = [name for name in COURSE_FIELDS if not str(data.get(name, "")).strip()]
+    if missing:
+        raise ValueError(f"course record is missing {', '.join(missing)}")
+    return {
+        "Subject": str(data["Subject"]),
+        "CatalogNbr": str(data["CatalogNbr"]),
+        "Title": data["Title"],
+        "Credits": data["Credits"],
+        "CourseID": int(data["CourseId"])
+    }
+
+
 def populate_table(table_name, data):
     """
     This function populates a table with a given name with
@@ -81,22 +239,12 @@ def populate_table(table_name, data):
     param data: json file with table data
     return: true if table is populated, false if population fails
     """
-    subject = data["Subject"]
-    catalog_nbr = data["CatalogNbr"]
-    title = data["Title"]
-    credit = data["Credits"]
-    course_id = int(data["CourseId"])
     try:
-        if dynamo_db.Table(table_name).put_item(
-            Item={
-                "Subject": subject,
-                "CatalogNbr": catalog_nbr,
-                "Title": title,
-                "Credits": credit,
-                "CourseID": course_id
-            }
+        item = course_item(data)
+        if course_scheduler(table_name).call(
+            lambda: get_write_resource().Table(table_name).put_item(Item=item),
+            item_write_units(item)
         ):
-            time.sleep(2)
             return True
 
     except Exception as error:
@@ -105,43 +253,467 @@ def populate_table(table_name, data):
     return False
 
 
+def iter_json_array(course_file):
+    """
+    This function reads the elements of a json array one at a time
+    Only one chunk of the file and the element being decoded are held in memory
+    param course_file: open text file containing a json array
+    return: generator of decoded elements
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    at_end = False
+    started = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if buffer[0] != "[":
+                raise ValueError("course data is not a json array")
+            buffer = buffer[1:].lstrip()
+            started = True
+        if started and buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if started and buffer.startswith("]"):
+            return
+        if started and buffer:
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                end = None
+            # a value running to the end of the buffer may continue in the next chunk
+            if end is not None and (end < len(buffer) or at_end):
+                yield element
+                buffer = buffer[end:]
+                continue
+        if at_end:
+            raise ValueError("course data ends before the json array is closed")
+        chunk = course_file.read(READ_CHUNK_SIZE)
+        at_end = not chunk
+        buffer += chunk
+
+
+def iter_json_lines(course_file):
+    """
+    This function reads one json record per line, skipping blank lines
+    param course_file: open text file in json lines format
+    return: generator of decoded records
+    """
+    for line in course_file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_course_records(courses_file, file_format=None):
+    """
+    This function streams course records from a json array, json lines or csv file
+    param courses_file: path of the course data file
+    param file_format: "json", "jsonl" or "csv", picked from the file extension when None
+    return: generator of course records
+    """
+    if file_format is None:
+        extension = os.path.splitext(courses_file)[1].lower()
+        file_format = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(
+            extension, "json")
+    with open(courses_file, encoding="utf-8", newline="") as course_file:
+        if file_format == "csv":
+            yield from csv.DictReader(course_file)
+        elif file_format == "jsonl":
+            yield from iter_json_lines(course_file)
+        else:
+            yield from iter_json_array(course_file)
+
+
+def course_scheduler(table_name):
+    """
+    This function returns the write scheduler that paces writes to a table
+    param table_name: name of the table
+    return: common.throttle.WriteScheduler
+    """
+    return write_scheduler(get_dynamo_resource().meta.client, table_name)
+
+
+def write_batch(table_name, items):
+    """
+    This function writes up to 25 items with one batch_write_item call
+    Writes are paced to the table's provisioned capacity, and throttled calls
+    and items dynamodb returns as unprocessed are retried with jittered
+    exponential backoff until every item is written
+    param table_name: name of table to be altered
+    param items: list of item dictionaries
+    return: number of items written, always len(items)
+    raises Exception: an error other than throttling, or a transient error that
+    outlasted the retries; the batch may be partly written
+    """
+    scheduler = course_scheduler(table_name)
+    requests = [{"PutRequest": {"Item": item}} for item in items]
+    attempt = 0
+    while requests:
+        batch = requests
+        response = scheduler.call(
+            lambda: get_write_resource().batch_write_item(RequestItems={table_name: batch}),
+            sum(item_write_units(request["PutRequest"]["Item"]) for request in batch))
+        requests = response.get("UnprocessedItems", {}).get(table_name, [])
+        if requests:
+            # unprocessed items are dynamodb throttling part of the batch
+            scheduler.throttled()
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+    return len(items)
+
+
+def dedupe_batch(items, key="CourseID"):
+    """
+    This function keeps one item per key in a batch, the last one wins
+    batch_write_item rejects a whole batch that puts the same key twice, while
+    separate put_item calls would simply overwrite the earlier item
+    param items: list of item dictionaries
+    param key: name of the table's key attribute
+    return: (list of items in first seen order, number of items replaced)
+    """
+    unique = {}
+    for item in items:
+        unique[item[key]] = item
+    return list(unique.values()), len(items) - len(unique)
+
+
+def bulk_load(table_name, records, writers=DEFAULT_WRITERS):
+    """
+    This function loads course records with batched writes on parallel writers
+    Throttled items are retried, only batches that hit another error count as failed.
+    Records repeating a CourseID in the same batch replace the earlier record
+    param table_name: name of table to be altered
+    param records: iterable of course records, may be a generator
+    param writers: number of batch_write_item calls sent at the same time
+    return: dictionary with written, replaced, failed and invalid item counts
+    and elapsed seconds
+    """
+    stats = {"Written": 0, "Replaced": 0, "Failed": 0, "Invalid": 0}
+    started = time.perf_counter()
+
+    def valid_items():
+        for record in records:
+            try:
+                yield course_item(record)
+            except (ValueError, TypeError, AttributeError) as error:
+                stats["Invalid"] += 1
+                log_message(f"skipped course record {record!r}: {error}")
+
+    def unique_batches():
+        for batch in iter_batches(valid_items(), WRITE_BATCH_SIZE):
+            batch, replaced = dedupe_batch(batch)
+            if replaced:
+                stats["Replaced"] += replaced
+                log_message(f"{replaced} course records replaced by a later record "
+                            f"with the same CourseID")
+            yield batch
+
+    for batch, future in bounded_map(lambda batch: write_batch(table_name, batch),
+                                     unique_batches(), writers):
+        try:
+            stats["Written"] += future.result()
+        except Exception as error:
+            log_message(error)
+            stats["Failed"] += len(batch)
+    stats["Seconds"] = time.perf_counter() - started
+    pacing = course_scheduler(table_name).stats()
+    log_message(f"{stats['Written']} items written to {table_name} "
+                f"({stats['Replaced']} replaced, {stats['Failed']} failed, "
+                f"{stats['Invalid']} invalid) at "
+                f"{stats['Written'] / max(stats['Seconds'], 1e-6):.1f} items/s",
+                operation="bulk_load", table=table_name,
+                duration=stats["Seconds"], items=stats["Written"],
+                replaced=stats["Replaced"], failed=stats["Failed"],
+                invalid=stats["Invalid"],
+                throttles=pacing["throttles"], throttle_wait=pacing["waited"])
+    return stats
+
+
 def get_title(subject, catalog_number):
     """
     this function gets the course title of a course with a given subject
     and catalog number
+    Titles, and courses that were not found, are kept in TITLE_CACHE so
+    repeated lookups do not reach dynamodb; with a snapshot in use dynamodb
+    is not used at all
     param subject: subject to be checked
     param catalog_number: catalog number of subject
     return: title of course or none
     """
+    if SNAPSHOT_FILES:
+        return snapshot_title(SNAPSHOT_FILES[0], subject, catalog_number)
+    cache_key = (subject, catalog_number)
+    cached = TITLE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached[0]
+    try:
+        title = query_title(subject, catalog_number)
+    except Exception as e:
+        log_message(e)
+        return None
+    TITLE_CACHE.put(cache_key, title,
+                    None if title is not None else MISSING_TITLE_TTL)
+    return title
+
+
+def query_title(subject, catalog_number):
+    """
+    this function looks a course title up in dynamodb
+    The lookup is a query on the Subject + CatalogNbr index, so its cost does
+    not depend on the size of the table
+    param subject: subject to be checked
+    param catalog_number: catalog number of subject
+    return: title of course or none if there is no such course
+    """
+    from boto3.dynamodb.conditions import Key
 
     try:
-        db_response = dynamo_db.Table("Courses").scan(
-            FilterExpression=Attr("Subject").eq(subject)
-            & Attr("CatalogNbr").eq(catalog_number),
-            ProjectionExpression=("Title")
+        db_response = get_dynamo_resource().Table("Courses").query(
+            IndexName=COURSE_INDEX,
+            KeyConditionExpression=Key("Subject").eq(subject)
+            & Key("CatalogNbr").eq(catalog_number),
+            ProjectionExpression="Title",
+            Limit=1
         )
-        title = [obj.get("Title") for obj in db_response["Items"]][0]
-        return title
     except Exception as e:
-        log_message(e)
+        if getattr(e, "response", {}).get("Error", {}).get("Code") \
+                == "ValidationException":
+            return scan_for_title(subject, catalog_number)
+        raise
+    for obj in db_response["Items"]:
+        return obj.get("Title")
     return None
 
 
-def build():
+def use_title_cache_file(path):
+    """
+    this function keeps TITLE_CACHE in a file between runs
+    The file is loaded now and saved when the program exits
+    param path: path of the cache file
+    """
+    if path in TITLE_CACHE_FILES:
+        return
+    TITLE_CACHE_FILES.append(path)
+    TITLE_CACHE.load(path)
+    atexit.register(save_title_cache, path)
+
+
+def save_title_cache(path):
+    """
+    this function saves TITLE_CACHE and logs its hit rate
+    param path: path of the cache file
+    """
+    stats = TITLE_CACHE.stats()
+    log_message(f"title cache: {stats['hits']} hits, {stats['misses']} misses",
+                operation="title_cache", **stats)
+    try:
+        TITLE_CACHE.save(path)
+    except OSError as error:
+        log_message(error)
+
+
+def drop_title_cache():
+    """
+    this function empties TITLE_CACHE and removes its files after the course
+    table was deleted or rebuilt, so no title outlives the table it came from
+    """
+    TITLE_CACHE.clear()
+    for path in TITLE_CACHE_FILES:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as error:
+            log_message(error)
+            continue
+        log_message(f"title cache {path} dropped, the course table changed")
+
+
+def scan_for_title(subject, catalog_number):
+    """
+    this function finds a course title by scanning every page of the table
+    It is only used for tables created before the index existed
+    param subject: subject to be checked
+    param catalog_number: catalog number of subject
+    return: title of course or none
+    """
+    from boto3.dynamodb.conditions import Attr
+
+    log_message(f"Courses has no {COURSE_INDEX}, falling back to a scan")
+    request = {
+        "FilterExpression": Attr("Subject").eq(subject)
+        & Attr("CatalogNbr").eq(catalog_number),
+        "ProjectionExpression": "Title"
+    }
+    while True:
+        db_response = get_dynamo_resource().Table("Courses").scan(**request)
+        for obj in db_response["Items"]:
+            return obj.get("Title")
+        if "LastEvaluatedKey" not in db_response:
+            return None
+        request["ExclusiveStartKey"] = db_response["LastEvaluatedKey"]
+
+
+def open_snapshot(path):
+    """
+    this function opens the sqlite snapshot of the Courses table
+    Each thread gets its own connection, the file and its indexes are created
+    the first time
+    param path: path of the snapshot file
+    return: sqlite3 connection
+    """
+    connections = getattr(SNAPSHOT_STATE, "connections", None)
+    if connections is None:
+        connections = SNAPSHOT_STATE.connections = {}
+    if path not in connections:
+        connection = sqlite3.connect(path)
+        connection.executescript(SNAPSHOT_SCHEMA)
+        connections[path] = connection
+    return connections[path]
+
+
+def use_snapshot(path):
+    """
+    this function serves course lookups from a snapshot instead of dynamodb
+    param path: path of the snapshot file
+    raises ValueError: if the snapshot was never refreshed, lookups would find nothing
+    """
+    if not os.path.exists(path) or snapshot_age(path) is None:
+        raise ValueError(f"snapshot {path} has not been created yet, "
+                         f"run the snapshot command with --output {path} first")
+    if path not in SNAPSHOT_FILES:
+        SNAPSHOT_FILES.append(path)
+
+
+def snapshot_title(path, subject, catalog_number):
+    """
+    this function gets a course title from the snapshot
+    param path: path of the snapshot file
+    param subject: subject to be checked
+    param catalog_number: catalog number of subject
+    return: title of course or none
+    """
+    row = open_snapshot(path).execute(
+        "SELECT Title FROM courses WHERE Subject = ? AND CatalogNbr = ? LIMIT 1",
+        (subject, catalog_number)).fetchone()
+    return None if row is None else row[0]
+
+
+def snapshot_age(path):
+    """
+    this function returns how long ago the snapshot was refreshed
+    param path: path of the snapshot file
+    return: age in seconds or None if it was never refreshed
+    """
+    row = open_snapshot(path).execute(
+        "SELECT value FROM snapshot_info WHERE name = 'refreshed_at'").fetchone()
+    return None if row is None else time.time() - float(row[0])
+
+
+def iter_table_courses(segments=4):
+    """
+    this function reads every course from the Courses table with a parallel scan
+    param segments: number of segments scanned at the same time
+    return: generator of course rows in SNAPSHOT_ATTRIBUTES order
+    """
+    for page in iter_table_items("Courses", segments, SNAPSHOT_ATTRIBUTES):
+        for item in page:
+            yield (int(item["CourseID"]), str(item["Subject"]), str(item["CatalogNbr"]),
+                   item["Title"], str(item.get("Credits", "")))
+
+
+def iter_file_courses(courses_file, file_format=None):
+    """
+    this function reads every valid course from a course data file
+    param courses_file: path of the json, json lines or csv file with the course data
+    param file_format: format of courses_file, see iter_course_records
+    return: generator of course rows in SNAPSHOT_ATTRIBUTES order
+    """
+    for record in iter_course_records(courses_file, file_format):
+        try:
+            item = course_item(record)
+        except (TypeError, ValueError) as error:
+            log_message(error)
+            continue
+        yield tuple(str(item[name]) if name != "CourseID" else item[name]
+                    for name in SNAPSHOT_ATTRIBUTES)
+
+
+def refresh_snapshot(path, rows, source):
+    """
+    this function brings the snapshot up to date with a full list of courses
+    Only courses that were added or changed are written and courses that are
+    no longer listed are removed, all in one transaction, so lookups never see
+    a half refreshed snapshot
+    param path: path of the snapshot file
+    param rows: iterable of course rows in SNAPSHOT_ATTRIBUTES order
+    param source: where the rows came from, kept with the snapshot
+    return: dictionary with Inserted, Updated, Deleted, Unchanged and Seconds
+    """
+    started = time.perf_counter()
+    connection = open_snapshot(path)
+    stats = {"Inserted": 0, "Updated": 0, "Deleted": 0, "Unchanged": 0}
+    with connection:
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS seen (CourseID INTEGER PRIMARY KEY)")
+        connection.execute("DELETE FROM seen")
+        for row in rows:
+            connection.execute("INSERT OR IGNORE INTO seen VALUES (?)", (row[0],))
+            exists = connection.execute(
+                "SELECT 1 FROM courses WHERE CourseID = ?", (row[0],)).fetchone()
+            changed = connection.execute(
+                "INSERT INTO courses VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (CourseID) DO UPDATE SET Subject = excluded.Subject, "
+                "CatalogNbr = excluded.CatalogNbr, Title = excluded.Title, "
+                "Credits = excluded.Credits "
+                "WHERE (Subject, CatalogNbr, Title, Credits) IS NOT "
+                "(excluded.Subject, excluded.CatalogNbr, excluded.Title, excluded.Credits)",
+                row).rowcount
+            if not changed:
+                stats["Unchanged"] += 1
+            elif exists:
+                stats["Updated"] += 1
+            else:
+                stats["Inserted"] += 1
+        stats["Deleted"] = connection.execute(
+            "DELETE FROM courses WHERE CourseID NOT IN (SELECT CourseID FROM seen)").rowcount
+        connection.executemany(
+            "INSERT OR REPLACE INTO snapshot_info VALUES (?, ?)",
+            [("refreshed_at", str(time.time())), ("source", source)])
+    stats["Seconds"] = time.perf_counter() - started
+    if stats["Inserted"] or stats["Updated"] or stats["Deleted"]:
+        drop_search_index()
+    log_message(f"snapshot {path} refreshed from {source}: {stats['Inserted']} added, "
+                f"{stats['Updated']} changed, {stats['Deleted']} removed",
+                operation="refresh_snapshot", duration=stats["Seconds"],
+                inserted=stats["Inserted"], updated=stats["Updated"],
+                deleted=stats["Deleted"], unchanged=stats["Unchanged"])
+    return stats
+
+
+def build(courses_file="courses.json", writers=DEFAULT_WRITERS, file_format=None):
     """
     This function builds the Courses table
+    The course data is streamed into the batch writers, so memory use does not
+    grow with the size of the file
+    param courses_file: path of the json, json lines or csv file with the course data
+    param writers: number of parallel batch writers
+    param file_format: format of courses_file, see iter_course_records
     """
     if table_exists("Courses"):
         print("Courses already exists")
         return
 
     create_course_table()
-    time.sleep(7)
+    set_table_status("Courses", "CREATING")
+    drop_search_index()
+    drop_title_cache()
+    wait_for_table("Courses")
     try:
-        with open("courses.json", encoding="utf-8") as courses:
-            json_reader = json.load(courses)
-            for item in json_reader:
-                populate_table("Courses", item)
+        stats = bulk_load("Courses", iter_course_records(courses_file, file_format),
+                          writers)
+        print(f"{stats['Written']} courses loaded at "
+              f"{stats['Written'] / max(stats['Seconds'], 1e-6):.1f} items/s")
+        if stats["Replaced"]:
+            print(f"{stats['Replaced']} records repeated a CourseID and were replaced")
 
     except Exception as error:
         log_message(error)
@@ -180,16 +752,266 @@ def query():
             print(f"{subject} {catalog_nbr} {course_title}")
 
 
-def main():
+def parse_course(line):
+    """
+    this function reads a "SUBJ NNN" course from a line of a lookup file
+    param line: line of text
+    return: (subject, catalog number) or None if the line is not a course
+    """
+    match = COURSE_PATTERN.match(line)
+    if match is None:
+        return None
+    return match.group(1).upper(), match.group(2)
+
+
+def lookup_titles(lines, workers=DEFAULT_LOOKUP_WORKERS):
+    """
+    this function looks up the titles of many courses at once
+    Repeated courses are looked up once, distinct courses are looked up on a
+    thread pool through get_title, and results come back in input order
+    while the input is still being read
+    batch_get_item is not used because it only reads by the table key
+    (CourseID) and these lookups go through the Subject + CatalogNbr index
+    param lines: iterable of "SUBJ NNN" lines, may be a generator
+    param workers: number of lookups running at the same time
+    return: generator of (line, course or None, title or None)
+    """
+    def resolve(course):
+        return None if course is None else get_title(*course)
+
+    courses = ((line, parse_course(line)) for line in lines if line.strip())
+    for (line, course), future in ordered_map(
+            lambda entry: resolve(entry[1]), courses, workers,
+            dedupe=True, key=lambda entry: entry[1]):
+        yield line, course, future.result()
+
+
+def print_lookup_results(lines, workers=DEFAULT_LOOKUP_WORKERS, output=sys.stdout):
+    """
+    this function prints one tab separated result line per course in a lookup file
+    param lines: iterable of "SUBJ NNN" lines
+    param workers: number of lookups running at the same time
+    param output: file the results are written to
+    return: dictionary with found, missing and invalid counts and elapsed seconds
+    """
+    stats = {"Found": 0, "Missing": 0, "Invalid": 0}
+    started = time.perf_counter()
+    for line, course, title in lookup_titles(lines, workers):
+        if course is None:
+            stats["Invalid"] += 1
+            output.write(f"{line.strip()}\tINVALID\n")
+        elif title is None:
+            stats["Missing"] += 1
+            output.write(f"{course[0]} {course[1]}\tNOT FOUND\n")
+        else:
+            stats["Found"] += 1
+            output.write(f"{course[0]} {course[1]}\t{title}\n")
+    stats["Seconds"] = time.perf_counter() - started
+    cache_stats = TITLE_CACHE.stats()
+    log_message(f"{stats['Found'] + stats['Missing']} courses looked up in "
+                f"{stats['Seconds']:.2f} seconds",
+                operation="lookup_titles", duration=stats["Seconds"],
+                found=stats["Found"], missing=stats["Missing"],
+                invalid=stats["Invalid"], cache_hits=cache_stats["hits"])
+    return stats
+
+
+def bulk_query():
+    """
+    this function allows users to look up every course listed in a file
+    """
+    if not table_exists("Courses"):
+        print("Courses table does not exist")
+        return
+    lookup_file = input("Enter the file of courses to look up: ")
+    try:
+        with open(lookup_file, encoding="utf-8") as lines:
+            print_lookup_results(lines)
+    except OSError as error:
+        log_message(error)
+        print(f"Could not read {lookup_file}")
+
+
+class CourseSearchIndex:
+    """
+    In memory keyword and course code index over the course catalog
+    Title words map to the CourseIDs that contain them, and a sorted list of
+    course codes ("CMIS242") answers prefix searches such as "CMIS 2" with a
+    binary search, so searches never touch dynamodb
+    """
+
+    def __init__(self, rows=()):
+        self.courses = {}
+        self.postings = {}
+        self.words = []
+        self.codes = []
+        for row in rows:
+            self.add(row)
+        self.finish()
+
+    def add(self, row):
+        """
+        param row: course row in SNAPSHOT_ATTRIBUTES order
+        """
+        course_id, subject, catalog_nbr, title = row[0], row[1], row[2], row[3]
+        self.courses[course_id] = tuple(row)
+        for word in TOKEN_PATTERN.findall(title.lower()):
+            self.postings.setdefault(word, set()).add(course_id)
+        self.codes.append((f"{subject}{catalog_nbr}".upper(), course_id))
+
+    def finish(self):
+        """
+        sorts the word and code lists once every course has been added
+        """
+        self.words = sorted(self.postings)
+        self.codes.sort()
+
+    def matching_words(self, prefix):
+        """
+        param prefix: start of a title word
+        return: every indexed word starting with prefix
+        """
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + "\uffff")
+        return self.words[start:end]
+
+    def search(self, text):
+        """
+        finds the courses whose titles have a word starting with each word of text
+        param text: search words, e.g. "intro prog"
+        return: list of course rows sorted by course code
+        """
+        found = None
+        for query_word in TOKEN_PATTERN.findall(text.lower()):
+            ids = set()
+            for word in self.matching_words(query_word):
+                ids |= self.postings[word]
+            found = ids if found is None else found & ids
+            if not found:
+                return []
+        return self.rows(found or ())
+
+    def code_prefix(self, prefix):
+        """
+        finds the courses whose code starts with prefix
+        param prefix: e.g. "CMIS", "CMIS 2" or "CMIS 2xx"
+        return: list of course rows sorted by course code
+        """
+        prefix = re.sub(r"[\s-]", "", prefix).upper()
+        # x placeholders only count in the catalog number, "MATX" is a subject
+        prefix = prefix[:4] + prefix[4:].rstrip("X")
+        start = bisect.bisect_left(self.codes, (prefix,))
+        end = bisect.bisect_left(self.codes, (prefix + "\uffff",))
+        return [self.courses[course_id] for _, course_id in self.codes[start:end]]
+
+    def rows(self, course_ids):
+        """
+        param course_ids: iterable of CourseIDs
+        return: list of course rows sorted by course code
+        """
+        return sorted((self.courses[course_id] for course_id in course_ids),
+                      key=lambda row: (row[1], row[2]))
+
+    def save(self, path):
+        """
+        writes the courses to a json file, the index is rebuilt when loaded
+        param path: path of the index file
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as index_file:
+            json.dump({"courses": list(self.courses.values())}, index_file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        param path: path of an index file written by save
+        return: CourseSearchIndex
+        """
+        with open(path, encoding="utf-8") as index_file:
+            return cls(json.load(index_file)["courses"])
+
+
+def search_index(path=SEARCH_INDEX_FILE, courses_file=None, rebuild=False):
+    """
+    this function loads the search index, building it first if needed
+    The index is built from a course data file when one is given, otherwise
+    from the Courses table with a parallel scan, and saved to path
+    param path: path of the index file
+    param courses_file: course data file to build the index from
+    param rebuild: build the index even if the file already exists
+    return: CourseSearchIndex
+    """
+    if path not in SEARCH_INDEX_FILES:
+        SEARCH_INDEX_FILES.append(path)
+    if not rebuild and os.path.exists(path):
+        return CourseSearchIndex.load(path)
+    started = time.perf_counter()
+    if courses_file:
+        index = CourseSearchIndex(iter_file_courses(courses_file))
+    else:
+        index = CourseSearchIndex(iter_table_courses())
+    index.save(path)
+    log_message(f"search index {path} built with {len(index.courses)} courses",
+                operation="search_index", duration=time.perf_counter() - started,
+                courses=len(index.courses), words=len(index.words))
+    return index
+
+
+def drop_search_index():
+    """
+    this function removes the search index files after the course catalog changed
+    so the next search builds them again
+    """
+    for path in {SEARCH_INDEX_FILE, *SEARCH_INDEX_FILES}:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as error:
+            log_message(error)
+            continue
+        log_message(f"search index {path} dropped, the course catalog changed")
+
+
+def print_courses(rows):
+    """
+    this function prints course rows, one per line
+    param rows: list of course rows in SNAPSHOT_ATTRIBUTES order
+    """
+    for row in rows:
+        print(f"{row[1]} {row[2]} {row[3]}")
+    print(f"{len(rows)} courses found")
+
+
+def search():
+    """
+    this function allows users to search course titles and course codes
+    """
+    try:
+        index = search_index()
+    except Exception as error:
+        log_message(error)
+        print("Could not load or build the search index")
+        return
+    text = input("Enter words from the title, or a code such as CMIS 2xx: ").strip()
+    rows = index.code_prefix(text) if COURSE_CODE_PREFIX.match(text) else []
+    # four letter words such as "java" are tried as a subject first
+    print_courses(rows or index.search(text))
+
+
+def run_menu():
     """
-    Main function, calls other functions as needed by user
+    Menu loop, calls other functions as needed by user
     """
     while True:
         print("Select Function from the options below\n")
         print("1. Create DB")
         print("2. Search for courses")
         print("3. Delete Table")
-        print("4. Exit program")
+        print("4. Look up courses from a file")
+        print("5. Search course titles")
+        print("6. Exit program")
 
         user_select = str(input("Select number from menu: "))
         if user_select == "1":
@@ -199,10 +1021,220 @@ def main():
         elif user_select == "3":
             delete_table("Courses")
         elif user_select == "4":
+            bulk_query()
+        elif user_select == "5":
+            search()
+        elif user_select == "6":
             print("Exiting program. Goodbye!")
             break
         else:
             print("That is not one of the options")
 
 
-main()
\ No newline at end of file
+def command_build(args):
+    """
+    build command: creates and populates the Courses table
+    """
+    build(args.file, args.writers, args.format)
+
+
+def command_query(args):
+    """
+    query command: prints the title of one course
+    """
+    subject = args.subject.upper()
+    course_title = get_title(subject, args.catalog_nbr)
+    if course_title is None:
+        print(f"No course named {subject} {args.catalog_nbr} found")
+        return False
+    print(f"{subject} {args.catalog_nbr} {course_title}")
+    return True
+
+
+def command_add_index(args):
+    """
+    add-index command: adds the lookup index to an existing Courses table
+    """
+    add_course_index()
+
+
+def command_lookup(args):
+    """
+    lookup command: prints the titles of every course in a file or stdin
+    """
+    if args.file == "-":
+        stats = print_lookup_results(sys.stdin, args.workers)
+    else:
+        with open(args.file, encoding="utf-8") as lines:
+            stats = print_lookup_results(lines, args.workers)
+    return stats["Invalid"] == 0
+
+
+def command_export(args):
+    """
+    export command: writes every course to a json lines or csv file
+    """
+    stats = export_from_args("Courses", args)
+    log_message(f"{stats['Items']} courses exported to {args.output} in "
+                f"{stats['Seconds']:.2f} seconds",
+                operation="export", duration=stats["Seconds"], items=stats["Items"],
+                pages=stats["Pages"], segments=args.segments)
+    print(f"{stats['Items']} courses exported to {args.output}")
+    if "Key" in stats:
+        print(f"Uploaded to s3://{args.bucket}/{stats['Key']}")
+
+
+def command_snapshot(args):
+    """
+    snapshot command: creates or refreshes the local copy of the Courses table
+    """
+    age = snapshot_age(args.output)
+    if age is not None and args.max_age is not None and age < args.max_age:
+        print(f"{args.output} was refreshed {age:.0f} seconds ago, nothing to do")
+        return
+    if args.from_file:
+        stats = refresh_snapshot(args.output, iter_file_courses(args.from_file),
+                                 args.from_file)
+    else:
+        stats = refresh_snapshot(args.output, iter_table_courses(args.segments), "Courses")
+    print(f"{args.output}: {stats['Inserted']} added, {stats['Updated']} changed, "
+          f"{stats['Deleted']} removed, {stats['Unchanged']} unchanged")
+
+
+def command_search(args):
+    """
+    search command: prints the courses matching title words or a code prefix
+    """
+    index = search_index(args.index, args.from_file, args.rebuild)
+    if args.code:
+        rows = index.code_prefix(args.code)
+    else:
+        rows = index.search(" ".join(args.words))
+    print_courses(rows)
+    return bool(rows)
+
+
+def command_status(args):
+    """
+    status command: prints the status of the Courses table
+    """
+    print(f"Courses: {table_status(get_dynamo_resource().meta.client, 'Courses')}")
+
+
+def command_delete_table(args):
+    """
+    delete-table command: deletes the Courses table
+    """
+    delete_table("Courses")
+
+
+def setup_cli(args):
+    """
+    applies the options shared by every command
+    """
+    if args.title_cache:
+        use_title_cache_file(args.title_cache)
+    if args.snapshot and args.command != "snapshot":
+        try:
+            use_snapshot(args.snapshot)
+        except ValueError as error:
+            sys.exit(str(error))
+
+
+def build_parser():
+    """
+    This function builds the command line parser
+    Each menu item is a subcommand; running without arguments opens the menu
+    return: argparse parser
+    """
+    parser = argparse.ArgumentParser(
+        description="Manage the Courses table. Run without arguments for the interactive menu.")
+    add_client_options(parser)
+    parser.add_argument("--title-cache", metavar="FILE",
+                        help="keep looked up course titles in FILE between runs")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="look courses up in the local copy made by the snapshot "
+                             "command instead of dynamodb")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    command = subparsers.add_parser("build", help="create and populate the Courses table")
+    command.add_argument("--file", default="courses.json", help="course data to load")
+    command.add_argument("--writers", type=int, default=DEFAULT_WRITERS,
+                         help="parallel batch_write_item calls")
+    command.add_argument("--format", choices=["json", "jsonl", "csv"],
+                         help="format of the course data, picked from the extension by default")
+    command.set_defaults(func=command_build)
+
+    command = subparsers.add_parser("query", help="search for a course title")
+    command.add_argument("subject", help="4 letter course code, e.g. CMIS")
+    command.add_argument("catalog_nbr", help="3 digit catalog number, e.g. 242")
+    command.set_defaults(func=command_query)
+
+    command = subparsers.add_parser(
+        "add-index", help="add the subject/catalog number index to an existing Courses table")
+    command.set_defaults(func=command_add_index)
+
+    command = subparsers.add_parser(
+        "lookup", help="look up every \"SUBJ NNN\" course in a file, in input order")
+    command.add_argument("file", help="one course per line, '-' for stdin")
+    command.add_argument("--workers", type=int, default=DEFAULT_LOOKUP_WORKERS,
+                         help="lookups running at the same time")
+    command.set_defaults(func=command_lookup)
+
+    command = subparsers.add_parser(
+        "export", help="parallel scan the Courses table into a json lines or csv file")
+    add_export_options(command, "courses.jsonl")
+    command.set_defaults(func=command_export)
+
+    command = subparsers.add_parser(
+        "snapshot", help="copy the Courses table into a local sqlite file, "
+                         "later runs only apply the changes")
+    command.add_argument("--output", default="courses.db", help="snapshot file")
+    command.add_argument("--from-file", metavar="FILE",
+                         help="read the courses from a course data file instead of the table")
+    command.add_argument("--segments", type=int, default=4,
+                         help="segments scanned in parallel")
+    command.add_argument("--max-age", type=float, metavar="SECONDS",
+                         help="skip the refresh if the snapshot is newer than this")
+    command.set_defaults(func=command_snapshot)
+
+    command = subparsers.add_parser(
+        "search", help="search course titles by keyword or courses by code prefix")
+    command.add_argument("words", nargs="*", help="words, or starts of words, from the title")
+    command.add_argument("--code", metavar="PREFIX",
+                         help="course code prefix instead of words, e.g. \"CMIS 2xx\"")
+    command.add_argument("--index", default=SEARCH_INDEX_FILE,
+                         help="index file, built on first use and dropped when the "
+                              "table is built, deleted or a snapshot changes")
+    command.add_argument("--from-file", metavar="FILE",
+                         help="build the index from a course data file instead of the table")
+    command.add_argument("--rebuild", action="store_true",
+                         help="build the index again even if the file exists")
+    command.set_defaults(func=command_search)
+
+    command = subparsers.add_parser(
+        "status", help="print ACTIVE, CREATING, MISSING, ... for the Courses table")
+    command.set_defaults(func=command_status)
+
+    command = subparsers.add_parser("delete-table", help="delete the Courses table")
+    command.set_defaults(func=command_delete_table)
+
+    add_batch_command(subparsers)
+    return parser
+
+
+def main(argv=None):
+    """
+    Main function, opens the menu or runs the commands given on the command line
+    param argv: command line arguments, defaults to sys.argv
+    return: process exit code
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_menu()
+        return 0
+    return run_cli(build_parser(), argv, setup_cli)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,163 @@
-import boto3
+import argparse
+import atexit
+import base64
 import json
 import logging
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from array import array
 
-lambda_client = boto3.client('lambda')
+# the shared helpers live in the common package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.batching import iter_batches, ordered_map  # noqa: E402
+from common.cache import DiskCache, TieredCache, TTLCache  # noqa: E402
+from common.cli import add_batch_command, run_cli  # noqa: E402
+from common.clients import add_client_options, get_client  # noqa: E402
+from common.event_log import configure_logging  # noqa: E402
+from common.latency import LatencyRecorder  # noqa: E402
 
-# logger configuration to write  messages to event_log.txt
-logging.basicConfig(filename="./event_log.txt",
-                    format="%(asctime)s %(levelname)s : %(message)s",
-                    datefmt="%Y-%m-%d %H:%M",
-                    filemode="a",
-                    level=logging.INFO)
+# log messages are written to event_log.txt by a background thread
+configure_logging()
 
 
-def log_message(message=None):
+def log_message(message=None, **fields):
     """
     This function utilizes the logger to log messages
     param message: message to be logged
+    param fields: extra values stored with the message, e.g. duration or bytes
     """
     if message is not None:
-        logging.info(message)
+        logging.info(message, extra=fields, stacklevel=2)
+
+
+def get_lambda_client():
+    """
+    return: shared boto3 lambda client object from common.clients
+    """
+    return get_client('lambda')
+
+# operation name: (lambda function, operand names, operand defaults)
+OPERATIONS = {
+    "add": ("lambda_addition", ("num1", "num2"), (0, 0)),
+    "multiply": ("lambda_multiply", ("num1", "num2", "num3"), (0, 1, 1)),
+    "power": ("lambda_power", ("base", "exponent"), (0, 1)),
+}
+DEFAULT_CONCURRENCY = 32
+# the functions are pure, so their results are kept and reused
+RESULT_CACHE_FILE = "lambda_results.db"
+RESULT_MEMORY_ENTRIES = 10000
+RESULT_DISK_ENTRIES = 1000000
+RESULT_TTL = 365 * 24 * 60 * 60
+RESULT_CACHES = []
+# operand tuples packed into one vectorized invoke, well under the 6 MB payload limit
+DEFAULT_VECTOR_CHUNK = 50000
+VECTOR_ENCODING = "float64-le-base64"
+BACKEND_NAMES = ("remote", "local", "process", "auto")
+# vectorized requests with at least this many operations go to lambda under "auto"
+DEFAULT_REMOTE_THRESHOLD = 10000
+BACKENDS = []
+# REPORT line lambda writes at the end of each invoke's log, LogType='Tail' returns it
+REPORT_FIELDS = {
+    "duration_ms": r"\bDuration: ([\d.]+) ms",
+    "billed_ms": r"Billed Duration: ([\d.]+) ms",
+    "init_ms": r"Init Duration: ([\d.]+) ms",
+    "memory_size_mb": r"Memory Size: (\d+) MB",
+    "max_memory_mb": r"Max Memory Used: (\d+) MB",
+}
+REPORT_PATTERNS = {name: re.compile(pattern) for name, pattern in REPORT_FIELDS.items()}
+TELEMETRY = LatencyRecorder()
+TELEMETRY_FILES = []
+
+
+def operation_payload(operation, operands):
+    """
+    param operation: key of OPERATIONS
+    param operands: numbers for the operation, missing ones use the defaults
+    return: (lambda function name, payload dictionary)
+    """
+    function_name, names, defaults = OPERATIONS[operation]
+    if len(operands) > len(names):
+        raise ValueError(f"{operation} takes at most {len(names)} numbers")
+    values = list(operands) + list(defaults[len(operands):])
+    return function_name, {name: f"{value}" for name, value in zip(names, values)}
+
+
+def use_result_cache(path=RESULT_CACHE_FILE):
+    """
+    turns on the result cache, kept in memory and, unless path is None, in a file
+    param path: path of the sqlite file for the disk tier
+    """
+    disk = DiskCache(path, RESULT_DISK_ENTRIES) if path else None
+    if not RESULT_CACHES:
+        atexit.register(log_result_cache_stats)
+    RESULT_CACHES[:] = [TieredCache(TTLCache(RESULT_MEMORY_ENTRIES, RESULT_TTL), disk)]
+
+
+def log_result_cache_stats():
+    """
+    logs the hit rate of the result cache
+    """
+    if RESULT_CACHES:
+        stats = RESULT_CACHES[0].stats()
+        log_message(f"result cache: {stats['memory_hits']} memory hits, "
+                    f"{stats['disk_hits']} disk hits, {stats['misses']} misses",
+                    operation="result_cache", **stats)
+
+
+def result_key(backend_name, function_name, payload):
+    """
+    Results of each backend are kept apart, so results computed locally are
+    never returned in place of a lambda invoke
+    param backend_name: name of the backend that computes the result
+    param function_name: name of the lambda function
+    param payload: dictionary sent to the function
+    return: cache key, the same for payloads with equal numbers such as "2" and "2.0"
+    """
+    operands = sorted((name, repr(float(value))) for name, value in payload.items())
+    return json.dumps([backend_name, function_name, operands])
+
+
+def invoke_function(function_name, payload, cached=True):
+    """
+    Results are served from the result cache when it is on; results of
+    calls that failed inside the function are not cached
+    param function_name: name of the lambda function
+    param payload: dictionary sent to the function
+    param cached: use the result cache, payloads must be operand numbers
+    return: response payload from the lambda function as text
+    """
+    cache = RESULT_CACHES[0] if RESULT_CACHES and cached else None
+    backend = current_backend()
+    if isinstance(backend, AutoBackend):
+        # cache under the backend that really computes the result
+        backend = backend.choose(payload)
+    if cache is not None:
+        key = result_key(backend.name, function_name, payload)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0]
+    result, succeeded = backend.invoke(function_name, payload)
+    if cache is not None and succeeded:
+        cache.put(key, result)
+    return result
+
+
+def call_operation(operation, *operands):
+    """
+    param operation: key of OPERATIONS
+    param operands: user supplied numbers
+    return: response payload from the lambda function as text
+    """
+    function_name, payload = operation_payload(operation, operands)
+    result = invoke_function(function_name, payload)
+    print("result: " + result + "\n")
+    log_message(f"{function_name} function called successfuly with result: {result}")
+    return result
+
 
 def call_addition(num1=0, num2=0):
     """
@@ -26,21 +165,8 @@ def call_addition(num1=0, num2=0):
     param default value: 0
     return response: response from 'lambda_addition' lambda function
     """
-    response = lambda_client.invoke(
-        FunctionName = "lambda_addition",
-        InvocationType='RequestResponse',  # Can be 'Event' for asynchronous invocation
-        LogType='Tail',
-        Payload = json.dumps({
-            "num1" : f"{num1}",
-            "num2" : f"{num2}"
-            })
-        )
-    result = response['Payload'].read().decode('utf-8')
-    print("result: " + result + "\n")
-    log_message(f"lambda_addition function called successfuly with result: \
-        {result}")
-    
-    
+    return call_operation("add", num1, num2)
+
 
 def call_multiply(num1=0, num2=1, num3=1):
     """
@@ -48,44 +174,488 @@ def call_multiply(num1=0, num2=1, num3=1):
     param default value: 0 or 1
     return response: response from 'lambda_multiply' lambda function
     """
-    response = lambda_client.invoke(
-        FunctionName = "lambda_multiply",
-        InvocationType='RequestResponse',  # Can be 'Event' for asynchronous invocation
-        LogType='Tail',
-        Payload = json.dumps({
-            "num1" : f"{num1}",
-            "num2" : f"{num2}",
-            "num3" : f"{num3}"
-            })
-        )
-    
-    result = response['Payload'].read().decode('utf-8')
-    print("result: " + result + "\n")
-    log_message(f"lambda_multiply function called successfuly with result: \
-        {result}")
-    
-    
+    return call_operation("multiply", num1, num2, num3)
+
+
 def call_power(base=0, exponent=1):
     """
     param base, exponent: user supplied numbers to be used in an exponential calculation
     param default value: 0 or 1
     return response: response from 'lambda_power' lambda function
     """
-    response = lambda_client.invoke(
-        FunctionName = "lambda_power",
-        InvocationType='RequestResponse',  # Can be 'Event' for asynchronous invocation
-        LogType='Tail',
-        Payload = json.dumps({
-            "base" : f"{base}",
-            "exponent" : f"{exponent}"
-            })
-        )
-    
-    result = response['Payload'].read().decode('utf-8')
-    print("result: " + result + "\n")
-    log_message(f"lambda_power function called successfuly with result: \
-        {result}")
-    
+    return call_operation("power", base, exponent)
+
+
+def parse_operation(line):
+    """
+    param line: operation and its numbers, e.g. "multiply 2 3 4"
+    return: (operation, tuple of floats)
+    raises ValueError: if the operation is unknown or a number is not valid
+    """
+    words = line.split()
+    if not words or words[0] not in OPERATIONS:
+        raise ValueError(f"unknown operation in {line.strip()!r}, "
+                         f"expected one of {', '.join(OPERATIONS)}")
+    operands = tuple(float(word) for word in words[1:])
+    operation_payload(words[0], operands)
+    return words[0], operands
+
+
+def iter_operation_lines(lines):
+    """
+    param lines: iterable of text lines, blank lines and # comments are skipped
+    return: generator of stripped operation lines
+    """
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            yield line
+
+
+def timed_operation(line):
+    """
+    runs one operation line without printing
+    param line: operation and its numbers
+    return: (result text, seconds the call took)
+    """
+    started = time.perf_counter()
+    operation, operands = parse_operation(line)
+    result = invoke_function(*operation_payload(operation, operands))
+    return result, time.perf_counter() - started
+
+
+def run_operations(lines, concurrency=DEFAULT_CONCURRENCY, output=sys.stdout):
+    """
+    This function invokes the lambda functions for many operations at once
+    Up to concurrency invokes run at the same time on a thread pool and the
+    results are written in input order as they become available
+    param lines: iterable of operation lines, may be a stream
+    param concurrency: number of invokes running at the same time
+    param output: file the tab separated results are written to
+    return: dictionary with succeeded and failed counts and elapsed seconds
+    """
+    stats = {"Succeeded": 0, "Failed": 0}
+    started = time.perf_counter()
+    for line, future in ordered_map(timed_operation, iter_operation_lines(lines),
+                                    concurrency):
+        try:
+            result, seconds = future.result()
+        except Exception as error:
+            stats["Failed"] += 1
+            log_message(f"{line}: {error}")
+            output.write(f"{line}\tERROR {error}\n")
+            continue
+        stats["Succeeded"] += 1
+        output.write(f"{line}\t{result}\t{seconds * 1000:.1f} ms\n")
+    stats["Seconds"] = time.perf_counter() - started
+    log_message(f"{stats['Succeeded']} operations run in {stats['Seconds']:.2f} seconds "
+                f"({stats['Failed']} failed)",
+                operation="run_operations", duration=stats["Seconds"],
+                succeeded=stats["Succeeded"], failed=stats["Failed"],
+                concurrency=concurrency)
+    return stats
+
+
+def pack_numbers(values):
+    """
+    param values: iterable of numbers
+    return: base64 text of the numbers as little endian 64 bit floats
+    """
+    numbers = array("d", values)
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    return base64.b64encode(numbers.tobytes()).decode("ascii")
+
+
+def unpack_numbers(data):
+    """
+    param data: text from pack_numbers, or a plain list of numbers
+    return: list of floats
+    """
+    if isinstance(data, list):
+        return [float(value) for value in data]
+    numbers = array("d")
+    numbers.frombytes(base64.b64decode(data))
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    return numbers.tolist()
+
+
+def vector_payload(operation, operand_rows):
+    """
+    This function packs many operand tuples into one payload
+    Each operand becomes one packed column, missing operands use the defaults
+    param operation: key of OPERATIONS
+    param operand_rows: list of operand tuples
+    return: (lambda function name, payload dictionary)
+    """
+    function_name, names, defaults = OPERATIONS[operation]
+    columns = []
+    for position, name in enumerate(names):
+        columns.append(pack_numbers(
+            row[position] if position < len(row) else defaults[position]
+            for row in operand_rows))
+    return function_name, {
+        "encoding": VECTOR_ENCODING,
+        "count": len(operand_rows),
+        "operands": dict(zip(names, columns)),
+    }
+
+
+def invoke_vector(operation, operand_rows):
+    """
+    This function runs many operations of one kind with a single invoke
+    The function answers a vectorized payload with {"results": packed column},
+    see local_handler
+    param operation: key of OPERATIONS
+    param operand_rows: list of operand tuples
+    return: list of results, in the order of operand_rows
+    raises ValueError: if the function did not return one result per tuple
+    """
+    function_name, payload = vector_payload(operation, operand_rows)
+    response = json.loads(invoke_function(function_name, payload, cached=False))
+    if not isinstance(response, dict) or "results" not in response:
+        raise ValueError(f"{function_name} did not return vectorized results: {response}")
+    results = unpack_numbers(response["results"])
+    if len(results) != len(operand_rows):
+        raise ValueError(f"{function_name} returned {len(results)} results "
+                         f"for {len(operand_rows)} operations")
+    return results
+
+
+def load_numpy():
+    """
+    return: the numpy module, or None when it is not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def reference_results(operation, operand_rows):
+    """
+    This function computes results locally to check the lambda functions against
+    numpy is used when it is installed, plain python otherwise
+    param operation: key of OPERATIONS
+    param operand_rows: list of operand tuples
+    return: list of results
+    """
+    _, names, defaults = OPERATIONS[operation]
+    columns = [[row[position] if position < len(row) else defaults[position]
+                for row in operand_rows] for position in range(len(names))]
+    numpy = load_numpy()
+    if numpy is not None:
+        arrays = [numpy.asarray(column, dtype=numpy.float64) for column in columns]
+        with numpy.errstate(all="ignore"):
+            if operation == "add":
+                return numpy.add(*arrays).tolist()
+            if operation == "multiply":
+                return (arrays[0] * arrays[1] * arrays[2]).tolist()
+            return numpy.power(*arrays).tolist()
+    results = []
+    for values in zip(*columns):
+        try:
+            if operation == "add":
+                results.append(values[0] + values[1])
+            elif operation == "multiply":
+                results.append(values[0] * values[1] * values[2])
+            else:
+                results.append(float(values[0] ** values[1]))
+        except (OverflowError, ZeroDivisionError):
+            results.append(infinite_power(values[0], values[1]))
+        except TypeError:
+            # negative numbers to fractional powers are complex, numpy gives nan
+            results.append(math.nan)
+    return results
+
+
+def infinite_power(base, exponent):
+    """
+    This function gives the infinity numpy returns for a power too large for a float
+    or for zero to a negative power
+    param base, exponent: operands of the power
+    return: -inf for a negative base to an odd whole exponent, inf otherwise
+    """
+    odd = float(exponent).is_integer() and float(exponent) % 2 == 1
+    return -math.inf if odd and math.copysign(1, base) < 0 else math.inf
+
+
+def results_match(result, expected):
+    """
+    param result, expected: numbers to compare
+    return: true if they are equal to within floating point error
+    """
+    if math.isnan(result) and math.isnan(expected):
+        return True
+    return math.isclose(result, expected, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def run_vector_chunk(lines, verify=False):
+    """
+    This function runs a chunk of operation lines with one invoke per operation kind
+    param lines: list of operation lines
+    param verify: compare every result with reference_results
+    return: list of (result, error) pairs in the order of lines
+    """
+    outcomes = [None] * len(lines)
+    groups = {}
+    for position, line in enumerate(lines):
+        try:
+            operation, operands = parse_operation(line)
+        except ValueError as error:
+            outcomes[position] = (None, str(error))
+            continue
+        groups.setdefault(operation, []).append((position, operands))
+    for operation, entries in groups.items():
+        operand_rows = [operands for _, operands in entries]
+        try:
+            results = invoke_vector(operation, operand_rows)
+        except Exception as error:
+            for position, _ in entries:
+                outcomes[position] = (None, str(error))
+            continue
+        expected = reference_results(operation, operand_rows) if verify else None
+        for number, (position, _) in enumerate(entries):
+            error = None
+            if expected is not None and not results_match(results[number], expected[number]):
+                error = f"expected {expected[number]!r}"
+            outcomes[position] = (results[number], error)
+    return outcomes
+
+
+def run_vector_operations(lines, chunk_size=DEFAULT_VECTOR_CHUNK,
+                          concurrency=DEFAULT_CONCURRENCY, verify=False, output=sys.stdout):
+    """
+    This function runs operation lines as vectorized invokes
+    Lines are read in chunks of chunk_size, each chunk costs one invoke per
+    operation kind in it, and up to concurrency chunks run at the same time
+    param lines: iterable of operation lines, may be a stream
+    param chunk_size: operation lines per chunk
+    param concurrency: number of chunks running at the same time
+    param verify: compare every result with reference_results
+    param output: file the tab separated results are written to
+    return: dictionary with succeeded and failed counts and elapsed seconds
+    """
+    stats = {"Succeeded": 0, "Failed": 0, "Chunks": 0}
+    started = time.perf_counter()
+    chunks = iter_batches(iter_operation_lines(lines), max(1, chunk_size))
+    for chunk, future in ordered_map(lambda chunk: run_vector_chunk(chunk, verify),
+                                     chunks, concurrency):
+        stats["Chunks"] += 1
+        for line, (result, error) in zip(chunk, future.result()):
+            if error is not None:
+                stats["Failed"] += 1
+                output.write(f"{line}\tERROR {error}\n")
+            else:
+                stats["Succeeded"] += 1
+                output.write(f"{line}\t{result!r}\n")
+    stats["Seconds"] = time.perf_counter() - started
+    log_message(f"{stats['Succeeded']} operations run in {stats['Chunks']} vectorized "
+                f"chunks in {stats['Seconds']:.2f} seconds ({stats['Failed']} failed)",
+                operation="run_vector_operations", duration=stats["Seconds"],
+                succeeded=stats["Succeeded"], failed=stats["Failed"],
+                chunks=stats["Chunks"], chunk_size=chunk_size)
+    return stats
+
+
+def local_handler(function_name, payload):
+    """
+    This function computes what the lambda function would return for a payload
+    Plain payloads get the result as a json number, vectorized payloads get
+    {"results": packed column}
+    param function_name: name of the lambda function
+    param payload: dictionary sent to the function
+    return: response payload as text
+    """
+    operation = next(name for name, (function, _, _) in OPERATIONS.items()
+                     if function == function_name)
+    names = OPERATIONS[operation][1]
+    if "operands" in payload:
+        columns = [unpack_numbers(payload["operands"][name]) for name in names]
+        results = reference_results(operation, list(zip(*columns)))
+        return json.dumps({"results": pack_numbers(results)})
+    operands = tuple(float(payload[name]) for name in names)
+    return json.dumps(reference_results(operation, [operands])[0])
+
+
+def parse_report(log_result):
+    """
+    This function reads the REPORT line from the log tail of an invoke
+    param log_result: base64 LogResult from the invoke response
+    return: dictionary of REPORT_FIELDS, init_ms is only there after a cold start
+    """
+    try:
+        log_tail = base64.b64decode(log_result).decode("utf-8", "replace")
+    except (TypeError, ValueError):
+        return {}
+    report = next((line for line in log_tail.splitlines()
+                   if line.startswith("REPORT")), None)
+    if report is None:
+        return {}
+    fields = {}
+    for name, pattern in REPORT_PATTERNS.items():
+        match = pattern.search(report)
+        if match:
+            fields[name] = float(match.group(1))
+    return fields
+
+
+def record_invoke(function_name, round_trip_ms, report):
+    """
+    This function adds one invoke to TELEMETRY
+    Overhead is the round trip minus the time the function ran, which is the
+    network, the lambda service and, after a cold start, the init time
+    param function_name: name of the lambda function
+    param round_trip_ms: client side time of the call
+    param report: fields from parse_report
+    """
+    TELEMETRY.count(function_name, "invokes")
+    TELEMETRY.record(function_name, "round_trip_ms", round_trip_ms)
+    for name, value in report.items():
+        TELEMETRY.record(function_name, name, value)
+    if "init_ms" in report:
+        TELEMETRY.count(function_name, "cold_starts")
+    if "duration_ms" in report:
+        TELEMETRY.record(function_name, "overhead_ms", max(
+            0.0, round_trip_ms - report["duration_ms"] - report.get("init_ms", 0.0)))
+
+
+def use_telemetry_file(path):
+    """
+    writes the TELEMETRY summary to a json file when the program exits
+    param path: path of the file
+    """
+    if path not in TELEMETRY_FILES:
+        TELEMETRY_FILES.append(path)
+        atexit.register(save_telemetry, path)
+
+
+def save_telemetry(path):
+    """
+    logs the latency percentiles of each function and saves them as json
+    param path: path of the file
+    """
+    for function_name, summary in TELEMETRY.summary().items():
+        metrics = summary["metrics"]
+        fields = {f"{metric}_{percent}": metrics[metric][percent]
+                  for metric in ("round_trip_ms", "duration_ms")
+                  if metric in metrics for percent in ("p50", "p99")}
+        log_message(f"{function_name}: {summary['counters'].get('invokes', 0)} invokes, "
+                    f"{summary['counters'].get('cold_starts', 0)} cold starts",
+                    operation="telemetry", function=function_name, **fields)
+    try:
+        TELEMETRY.save(path)
+    except OSError as error:
+        log_message(error)
+
+
+class RemoteBackend:
+    """
+    Invokes the deployed lambda functions and records their timings in TELEMETRY
+    """
+
+    name = "remote"
+
+    def invoke(self, function_name, payload):
+        """
+        param function_name: name of the lambda function
+        param payload: dictionary sent to the function
+        return: (response payload as text, false if the function raised an error)
+        """
+        started = time.perf_counter()
+        response = get_lambda_client().invoke(
+            FunctionName = function_name,
+            InvocationType='RequestResponse',  # Can be 'Event' for asynchronous invocation
+            LogType='Tail',
+            Payload = json.dumps(payload)
+            )
+        result = response['Payload'].read().decode('utf-8')
+        record_invoke(function_name, (time.perf_counter() - started) * 1000,
+                      parse_report(response.get("LogResult", "")))
+        if "FunctionError" in response:
+            TELEMETRY.count(function_name, "errors")
+        return result, "FunctionError" not in response
+
+
+class LocalBackend:
+    """
+    Runs local_handler in this process, no network and no AWS account needed
+    """
+
+    name = "local"
+
+    def invoke(self, function_name, payload):
+        return local_handler(function_name, payload), True
+
+
+class ProcessBackend:
+    """
+    Runs local_handler on a pool of worker processes so large vectorized
+    requests use every core
+    """
+
+    name = "process"
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.pool = None
+
+    def invoke(self, function_name, payload):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            atexit.register(self.pool.shutdown)
+        return self.pool.submit(local_handler, function_name, payload).result(), True
+
+
+class AutoBackend:
+    """
+    Runs small requests in this process and sends vectorized requests with
+    at least threshold operations to lambda
+    """
+
+    name = "auto"
+
+    def __init__(self, threshold=DEFAULT_REMOTE_THRESHOLD):
+        self.threshold = threshold
+        self.local = LocalBackend()
+        self.remote = RemoteBackend()
+
+    def choose(self, payload):
+        """
+        param payload: dictionary about to be sent
+        return: backend the payload goes to
+        """
+        return self.remote if payload.get("count", 1) >= self.threshold else self.local
+
+    def invoke(self, function_name, payload):
+        return self.choose(payload).invoke(function_name, payload)
+
+
+def use_backend(name="remote", threshold=DEFAULT_REMOTE_THRESHOLD, workers=None):
+    """
+    selects where the operations run for the rest of the process
+    param name: one of BACKEND_NAMES
+    param threshold: operations a vectorized request needs to go to lambda under "auto"
+    param workers: worker processes for the "process" backend, defaults to the cpu count
+    """
+    backends = {
+        "remote": RemoteBackend,
+        "local": LocalBackend,
+        "process": lambda: ProcessBackend(workers),
+        "auto": lambda: AutoBackend(threshold),
+    }
+    BACKENDS[:] = [backends[name]()]
+
+
+def current_backend():
+    """
+    return: the backend selected with use_backend, remote by default
+    """
+    if not BACKENDS:
+        use_backend()
+    return BACKENDS[0]
 
 
 def print_menu():
@@ -135,7 +705,7 @@ def handle_power():
     call_power(user_nums[0], user_nums[1])
     
 
-def main():
+def run_menu():
     while True:
         print_menu()
         user_select = str(input("Select number from menu: "))
@@ -150,5 +720,120 @@ def main():
             break
         else:
             print("Plese use the numbers provided in the menu\n")
-    
-main()
+
+
+def command_add(args):
+    call_addition(args.num1, args.num2)
+
+
+def command_multiply(args):
+    call_multiply(args.num1, args.num2, args.num3)
+
+
+def command_power(args):
+    call_power(args.base, args.exponent)
+
+
+def command_run(args):
+    def run(lines):
+        if args.vector:
+            return run_vector_operations(lines, args.chunk, args.concurrency, args.verify)
+        return run_operations(lines, args.concurrency)
+
+    if args.file == "-":
+        stats = run(sys.stdin)
+    else:
+        with open(args.file, encoding="utf-8") as lines:
+            stats = run(lines)
+    return stats["Failed"] == 0
+
+
+def setup_cli(args):
+    """
+    applies the options shared by every command
+    """
+    use_backend(args.backend, args.remote_threshold, args.processes)
+    if args.telemetry:
+        use_telemetry_file(args.telemetry)
+    if args.no_result_cache:
+        RESULT_CACHES.clear()
+    else:
+        use_result_cache(args.result_cache)
+
+
+def build_parser():
+    """
+    Each menu item is a subcommand; running without arguments opens the menu
+    return: argparse parser
+    """
+    parser = argparse.ArgumentParser(
+        description="Call the calculator lambda functions. "
+                    "Run without arguments for the interactive menu.")
+    add_client_options(parser)
+    parser.add_argument("--result-cache", metavar="FILE", default=RESULT_CACHE_FILE,
+                        help="file results are kept in between runs, '' keeps them "
+                             "in memory only")
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="always invoke the functions")
+    parser.add_argument("--backend", choices=BACKEND_NAMES, default="remote",
+                        help="where operations run: lambda, this process, a process "
+                             "pool, or auto (small requests here, large batches on lambda)")
+    parser.add_argument("--remote-threshold", type=int, default=DEFAULT_REMOTE_THRESHOLD,
+                        help="operations a vectorized request needs to go to lambda "
+                             "with --backend auto")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes for --backend process")
+    parser.add_argument("--telemetry", metavar="FILE",
+                        help="save per function latency percentiles, billed duration, "
+                             "cold starts and memory as json on exit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    command = subparsers.add_parser("add", help="add two numbers")
+    command.add_argument("num1", type=float)
+    command.add_argument("num2", type=float)
+    command.set_defaults(func=command_add)
+
+    command = subparsers.add_parser("multiply", help="multiply up to 3 numbers")
+    command.add_argument("num1", type=float)
+    command.add_argument("num2", type=float)
+    command.add_argument("num3", type=float, nargs="?", default=1)
+    command.set_defaults(func=command_multiply)
+
+    command = subparsers.add_parser("power", help="exponential computation")
+    command.add_argument("base", type=float)
+    command.add_argument("exponent", type=float)
+    command.set_defaults(func=command_power)
+
+    command = subparsers.add_parser(
+        "run", help="invoke the functions for every operation in a file concurrently")
+    command.add_argument("file", help="one operation per line, e.g. \"add 1 2\", "
+                                      "'-' for stdin")
+    command.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                         help="invokes running at the same time")
+    command.add_argument("--vector", action="store_true",
+                         help="pack many operations into each invoke")
+    command.add_argument("--chunk", type=int, default=DEFAULT_VECTOR_CHUNK,
+                         help="operations per vectorized invoke")
+    command.add_argument("--verify", action="store_true",
+                         help="check vectorized results against a local computation")
+    command.set_defaults(func=command_run)
+
+    add_batch_command(subparsers)
+    return parser
+
+
+def main(argv=None):
+    """
+    param argv: command line arguments, defaults to sys.argv
+    return: process exit code
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        use_result_cache()
+        run_menu()
+        return 0
+    return run_cli(build_parser(), argv, setup_cli)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,17 +10,34 @@ allows download of score file from s3 bucket
 """
 
 
+import argparse
+import os
 import sys
 from random import randint
 import uuid
 import curses
-from botocore.exceptions import ClientError
-import boto3
 
+# the shared helpers live in the common package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cli import add_batch_command, run_cli  # noqa: E402
+from common.clients import add_client_options, client_error, get_client, get_resource  # noqa: E402
+from common.export import add_export_options, export_from_args  # noqa: E402
+from common.tables import set_table_status, table_exists  # noqa: E402
+from common.throttle import PACED_CLIENT_SETTINGS, write_scheduler  # noqa: E402
 
-dynamo_db = boto3.resource('dynamodb')
-db_client = boto3.client('dynamodb', region_name="us-east-1")
-s3_client = boto3.client("s3")
+
+dynamo_db = None
+s3_client = None
+
+
+def load_aws():
+    """
+    gets the dynamodb resource and s3 client from common.clients on first use
+    """
+    global dynamo_db, s3_client
+    if dynamo_db is None:
+        dynamo_db = get_resource('dynamodb')
+        s3_client = get_client("s3")
 
 def print_menu():
     print("Welcome to Snake Game")
@@ -43,6 +60,7 @@ class App:
     apple = 0
 
     def __init__(self):
+        load_aws()
         if not self.table_exists("HighScores"):
             dynamo_db.create_table(
                 TableName="HighScores",
@@ -63,6 +81,7 @@ class App:
                     'WriteCapacityUnits': 10
                 }
             )
+            set_table_status("HighScores", "CREATING")
 
         self.create_bucket()
         
@@ -157,26 +176,26 @@ class App:
     def table_exists(self, table_name):
         """
         This function checks if a table with a given name exists
+        uses one describe_table call, cached for the process by common.tables
         param table_name: name of table to be checked
         """
-        tables = []
-        for table in dynamo_db.tables.all():
-            tables.append(table.name)
-        if table_name in tables:
-            return True
-        return False
+        return table_exists(dynamo_db.meta.client, table_name)
 
     def add_score(self, score_id, score):
         """
         adds scores to dynamo db table
+        the write is paced to the table's provisioned capacity and retried
+        while dynamodb throttles it, so scores are not dropped
         """
         try:
-            if dynamo_db.Table("HighScores").put_item(
+            scheduler = write_scheduler(dynamo_db.meta.client, "HighScores")
+            paced_db = get_resource('dynamodb', **PACED_CLIENT_SETTINGS)
+            if scheduler.call(lambda: paced_db.Table("HighScores").put_item(
                 Item={
                     "ScoreId" : score_id,
                     "Score": score
                 }
-            ):
+            )):
                 return True
 
         except Exception as error:
@@ -236,7 +255,7 @@ class App:
                 try:
                     s3_client.put_object(Bucket="sdev400-7380-high-scores",
                                      Key="./scores.txt", Body=open("scores.txt", "rb"))
-                except ClientError as error:
+                except client_error() as error:
                     print(error)
                     f.close()
                 f.close()
@@ -257,7 +276,7 @@ class App:
                     "sdev400-7380-high-scores", "./scores.txt", "scores.txt"
                 )
                 print("\nScores file downloaded\n")
-        except ClientError as error:
+        except client_error() as error:
             print(error)
 
     def load_scores_from_bucket(self):
@@ -279,19 +298,17 @@ class App:
         print()
 
 
-if __name__ == "__main__":
-    app = App()
+def run_menu(app):
+    """
+    menu loop, calls app methods as selected by the user
+    """
     while True:
         print_menu()
         user_select = str(input("Select number from menu: "))
         if user_select == "1":
             app.game()
         elif user_select == "2":
-            print("\nScores:")
-            db_scores = app.load_scores_from_db()
-            for s in db_scores:
-                print(s)
-            print()
+            print_db_scores(app)
         elif user_select == "3":
             app.update_score_file()
         elif user_select == "4":
@@ -302,3 +319,83 @@ if __name__ == "__main__":
             break
         else:
             print("That is not one of the options.")
+
+
+def print_db_scores(app):
+    """
+    prints every score in the database table, highest first
+    """
+    print("\nScores:")
+    db_scores = app.load_scores_from_db()
+    for s in db_scores:
+        print(s)
+    print()
+
+
+def export_scores(args):
+    """
+    writes every high score to a json lines or csv file, optionally uploaded to s3
+    """
+    stats = export_from_args("HighScores", args)
+    print(f"{stats['Items']} scores exported to {args.output} "
+          f"in {stats['Seconds']:.2f} seconds")
+    if "Key" in stats:
+        print(f"Uploaded to s3://{args.bucket}/{stats['Key']}")
+
+
+APPS = []
+
+
+def get_app():
+    """
+    returns the App for this process, so batch commands share one setup
+    """
+    if not APPS:
+        APPS.append(App())
+    return APPS[0]
+
+
+def build_parser():
+    """
+    each menu item is a subcommand; running without arguments opens the menu
+    """
+    parser = argparse.ArgumentParser(
+        description="Snake game with high scores in DynamoDB and S3. "
+                    "Run without arguments for the interactive menu.")
+    add_client_options(parser)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    commands = [
+        ("play", "play game", lambda args: get_app().game()),
+        ("db-scores", "load scores from database",
+         lambda args: print_db_scores(get_app())),
+        ("update-score-file", "update score file",
+         lambda args: get_app().update_score_file()),
+        ("download-score-file", "download score file",
+         lambda args: get_app().download_score_file()),
+        ("bucket-scores", "load scores from s3 bucket",
+         lambda args: get_app().load_scores_from_bucket()),
+    ]
+    for name, help_text, func in commands:
+        command = subparsers.add_parser(name, help=help_text)
+        command.set_defaults(func=func)
+    command = subparsers.add_parser(
+        "export", help="parallel scan the HighScores table into a json lines or csv file")
+    add_export_options(command, "scores.jsonl")
+    command.set_defaults(func=export_scores)
+    add_batch_command(subparsers)
+    return parser
+
+
+def main(argv=None):
+    """
+    opens the menu or runs the commands given on the command line
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_menu(get_app())
+        return 0
+    return run_cli(build_parser(), argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
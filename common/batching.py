@@ -0,0 +1,83 @@
+"""
+Batching and worker pool helpers shared by the assignment scripts
+"""
+import itertools
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+
+def bounded_map(function, items, workers=8):
+    """
+    This is a general function that runs a function over items on a thread pool
+    Items are pulled from the iterable lazily and only a few are queued per worker,
+    so an input of millions of items is never held in memory
+    param function: function called with each item
+    param items: iterable of items, may be a generator
+    param workers: number of threads
+    return: generator of (item, future) pairs in completion order
+    """
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        try:
+            for item in items:
+                pending[executor.submit(function, item)] = item
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future
+            for future in as_completed(pending):
+                yield pending[future], future
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def ordered_map(function, items, workers=8, dedupe=False, key=None):
+    """
+    This is a general function that runs a function over items on a thread pool
+    and hands the results back in input order
+    Items are pulled from the iterable lazily and at most a few per worker are
+    waiting at any time, so results stream out while the input is still read
+    param function: function called with each item
+    param items: iterable of items, may be a generator
+    param workers: number of threads
+    param dedupe: call function once per distinct item and share the result
+    param key: function giving the value items are deduplicated on, defaults to the item
+    return: generator of (item, future) pairs in input order
+    """
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        window = deque()
+        shared = {}
+        try:
+            for item in items:
+                shared_key = item if key is None else key(item)
+                future = shared.get(shared_key) if dedupe else None
+                if future is None:
+                    future = executor.submit(function, item)
+                    if dedupe:
+                        shared[shared_key] = future
+                window.append((item, future))
+                while window and (len(window) > workers * 4 or window[0][1].done()):
+                    yield window.popleft()
+            while window:
+                yield window.popleft()
+        finally:
+            for _, future in window:
+                future.cancel()
+
+
+def iter_batches(items, batch_size):
+    """
+    This is a general function that groups an iterable into lists
+    param items: iterable of items, may be a generator
+    param batch_size: maximum number of items per list
+    return: generator of lists
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,244 @@
+"""
+Least recently used caches shared by the assignment scripts
+TTLCache keeps entries in memory with per-entry expiry, DiskCache keeps them
+in a sqlite file, and TieredCache puts the first in front of the second
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded least recently used cache whose entries expire after a time to live
+    Entries can be given their own time to live, hits and misses are counted,
+    and the contents can be saved to and loaded from a json file
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, allow_expired=False):
+        """
+        param key: tuple naming the entry
+        param allow_expired: return expired entries instead of dropping them
+        return: (value, expired) or None when nothing is cached
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            expires_at, value = self.entries[key]
+            expired = time.time() > expires_at
+            if expired and not allow_expired:
+                del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value, expired
+
+    def put(self, key, value, ttl=None):
+        """
+        param key: tuple naming the entry
+        param value: value to cache
+        param ttl: seconds the entry stays valid, defaults to the cache's ttl
+        """
+        with self.lock:
+            self.entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        """
+        param key: tuple naming the entry to drop
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """
+        drops every entry
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        return: dictionary with entry count, hits, misses and hit rate
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def save(self, path):
+        """
+        This function writes the unexpired entries to a json file
+        Keys and values must be json serialisable
+        param path: path of the cache file
+        """
+        now = time.time()
+        with self.lock:
+            rows = [[list(key), expires_at, value]
+                    for key, (expires_at, value) in self.entries.items()
+                    if expires_at > now]
+        with open(path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump(rows, cache_file)
+        os.replace(path + ".tmp", path)
+
+    def load(self, path):
+        """
+        This function adds the unexpired entries of a json cache file
+        A missing or unreadable file leaves the cache empty
+        param path: path of the cache file
+        """
+        try:
+            with open(path, encoding="utf-8") as cache_file:
+                rows = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self.lock:
+            for key, expires_at, value in rows:
+                if expires_at > now:
+                    self.entries[tuple(key)] = (expires_at, value)
+                    self.entries.move_to_end(tuple(key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class DiskCache:
+    """
+    Bounded least recently used cache kept in a sqlite file
+    Entries never expire, the least recently used ones are removed once
+    there are more than max_entries; every thread uses its own connection
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.puts = 0
+
+    def connection(self):
+        """
+        return: this thread's sqlite3 connection, creating the file the first time
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("CREATE TABLE IF NOT EXISTS entries "
+                               "(key TEXT PRIMARY KEY, value TEXT, used_at REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_used_at "
+                               "ON entries (used_at)")
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        """
+        param key: string naming the entry
+        return: (value,) or None when nothing is cached
+        """
+        connection = self.connection()
+        row = connection.execute("SELECT value FROM entries WHERE key = ?",
+                                 (key,)).fetchone()
+        if row is None:
+            return None
+        with connection:
+            connection.execute("UPDATE entries SET used_at = ? WHERE key = ?",
+                               (time.time(), key))
+        return (json.loads(row[0]),)
+
+    def put(self, key, value):
+        """
+        param key: string naming the entry
+        param value: json serialisable value to cache
+        """
+        connection = self.connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                               (key, json.dumps(value), time.time()))
+        with self.lock:
+            self.puts += 1
+            evict = self.puts % 100 == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """
+        removes the least recently used entries beyond max_entries
+        """
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+                "ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class TieredCache:
+    """
+    TTLCache in memory in front of an optional DiskCache
+    Disk hits are copied into memory, and hits on each tier are counted
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        param key: string naming the entry
+        return: (value,) or None when nothing is cached
+        """
+        cached = self.memory.get((key,))
+        if cached is not None:
+            with self.lock:
+                self.memory_hits += 1
+            return (cached[0],)
+        cached = self.disk.get(key) if self.disk is not None else None
+        with self.lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self.memory.put((key,), cached[0])
+        return cached
+
+    def put(self, key, value):
+        """
+        param key: string naming the entry
+        param value: json serialisable value to cache
+        """
+        self.memory.put((key,), value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def stats(self):
+        """
+        return: dictionary with hits per tier, misses and hit rate
+        """
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                    "misses": self.misses,
+                    "hit_rate": hits / lookups if lookups else 0.0}
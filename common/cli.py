@@ -0,0 +1,85 @@
+"""
+Command line helpers shared by the assignment scripts
+Every script exposes its menu items as argparse subcommands and a batch
+subcommand that runs many commands in one process, so AWS clients are
+only set up once
+"""
+import shlex
+import sys
+
+from common.clients import configure_clients_from_args
+
+
+def add_batch_command(subparsers):
+    """
+    This function adds the batch subcommand to a script's parser
+    param subparsers: object returned by ArgumentParser.add_subparsers
+    """
+    batch = subparsers.add_parser(
+        "batch", help="run one command per line from a file ('-' for stdin)")
+    batch.add_argument("file", help="file of commands, blank lines and # comments are skipped")
+    batch.add_argument("--stop-on-error", action="store_true",
+                       help="stop at the first command that fails")
+
+
+def iter_batch_commands(path):
+    """
+    This function reads commands from a batch file
+    param path: path of the batch file, '-' reads standard input
+    return: generator of (line number, argument list) pairs
+    """
+    batch_file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(batch_file, start=1):
+            command = shlex.split(line, comments=True)
+            if command:
+                yield line_number, command
+    finally:
+        if batch_file is not sys.stdin:
+            batch_file.close()
+
+
+def run_command(args):
+    """
+    This function runs a single parsed command
+    param args: namespace from the parser, func is the command function
+    return: true if the command succeeded
+    """
+    try:
+        return args.func(args) is not False
+    except Exception as error:
+        print(f"{args.command} failed: {error}", file=sys.stderr)
+        return False
+
+
+def run_cli(parser, argv, setup=None):
+    """
+    This function runs a command line, or every command of a batch file
+    Client settings given on the command line apply to the whole batch
+    param parser: argparse parser whose subcommands set func
+    param argv: list of command line arguments
+    param setup: function called with the parsed arguments before any command runs
+    return: process exit code
+    """
+    args = parser.parse_args(argv)
+    configure_clients_from_args(args)
+    if setup is not None:
+        setup(args)
+    if args.command != "batch":
+        return 0 if run_command(args) else 1
+    failures = 0
+    for line_number, command in iter_batch_commands(args.file):
+        try:
+            command_args = parser.parse_args(command)
+        except SystemExit:
+            command_args = None
+        if command_args is None or command_args.command == "batch":
+            print(f"line {line_number}: invalid command", file=sys.stderr)
+            succeeded = False
+        else:
+            succeeded = run_command(command_args)
+        if not succeeded:
+            failures += 1
+            if args.stop_on_error:
+                break
+    return 1 if failures else 0
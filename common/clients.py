@@ -0,0 +1,140 @@
+"""
+AWS clients shared by the assignment scripts
+Clients are created once per (service, region) and reused by every command and
+worker thread in the process. boto3 clients are thread safe, resources are not,
+so resources are created once per (service, region) in each thread instead.
+boto3 is only imported when the first client or resource is requested.
+"""
+import threading
+
+# botocore defaults to a 10 connection pool, which the transfer worker pools outgrow
+CLIENT_SETTINGS = {
+    "max_pool_connections": 50,
+    "retry_mode": "adaptive",
+    "max_attempts": 10,
+    "connect_timeout": 10,
+    "read_timeout": 60,
+}
+
+CLIENTS = {}
+CLIENTS_LOCK = threading.Lock()
+THREAD_STATE = threading.local()
+# bumped by configure_clients so every thread drops resources built with old settings
+SETTINGS_VERSION = [0]
+
+
+def configure_clients(**settings):
+    """
+    This function changes the settings used for new clients and resources
+    Clients created before the change are dropped so the settings apply everywhere
+    param settings: any of the CLIENT_SETTINGS names, None values are ignored
+    """
+    unknown = set(settings) - set(CLIENT_SETTINGS)
+    if unknown:
+        raise ValueError(f"unknown client settings: {', '.join(sorted(unknown))}")
+    with CLIENTS_LOCK:
+        CLIENT_SETTINGS.update({name: value for name, value in settings.items()
+                                if value is not None})
+        CLIENTS.clear()
+        SETTINGS_VERSION[0] += 1
+
+
+class MissingBotocoreError(Exception):
+    """
+    Matches nothing; stands in for ClientError when botocore is not installed
+    """
+
+
+def client_error():
+    """
+    This function returns botocore's ClientError, importing botocore on first use
+    Use it in except clauses, which are only evaluated once an exception is raised
+    return: botocore.exceptions.ClientError
+    """
+    try:
+        from botocore.exceptions import ClientError
+    except ImportError:
+        return MissingBotocoreError
+    return ClientError
+
+
+def client_config(**overrides):
+    """
+    param overrides: CLIENT_SETTINGS names whose values differ for this client
+    return: botocore Config built from CLIENT_SETTINGS
+    """
+    from botocore.config import Config
+    settings = dict(CLIENT_SETTINGS, **overrides)
+    return Config(max_pool_connections=settings["max_pool_connections"],
+                  retries={"mode": settings["retry_mode"],
+                           "max_attempts": settings["max_attempts"]},
+                  connect_timeout=settings["connect_timeout"],
+                  read_timeout=settings["read_timeout"])
+
+
+def get_client(service, region=None, **overrides):
+    """
+    This function returns the shared client for a service and region
+    param service: service name, e.g. "s3"
+    param region: region name, None uses the configured default
+    param overrides: CLIENT_SETTINGS names whose values differ for this client
+    return: boto3 client object
+    """
+    key = (service, region, tuple(sorted(overrides.items())))
+    client = CLIENTS.get(key)
+    if client is None:
+        with CLIENTS_LOCK:
+            if key not in CLIENTS:
+                import boto3.session
+                CLIENTS[key] = boto3.session.Session().client(
+                    service, region_name=region, config=client_config(**overrides))
+            client = CLIENTS[key]
+    return client
+
+
+def get_resource(service, region=None, **overrides):
+    """
+    This function returns this thread's resource for a service and region
+    param service: service name, e.g. "dynamodb"
+    param region: region name, None uses the configured default
+    param overrides: CLIENT_SETTINGS names whose values differ for this resource
+    return: boto3 service resource
+    """
+    if getattr(THREAD_STATE, "version", None) != SETTINGS_VERSION[0]:
+        THREAD_STATE.version = SETTINGS_VERSION[0]
+        THREAD_STATE.resources = {}
+    resources = THREAD_STATE.resources
+    key = (service, region, tuple(sorted(overrides.items())))
+    if key not in resources:
+        import boto3.session
+        with CLIENTS_LOCK:
+            session = boto3.session.Session()
+        resources[key] = session.resource(service, region_name=region,
+                                          config=client_config(**overrides))
+    return resources[key]
+
+
+def add_client_options(parser):
+    """
+    This function adds the client settings to a script's parser
+    param parser: argparse parser
+    """
+    group = parser.add_argument_group("AWS client settings")
+    group.add_argument("--max-pool-connections", type=int,
+                       help=f"connections per client (default {CLIENT_SETTINGS['max_pool_connections']})")
+    group.add_argument("--retry-mode", choices=["legacy", "standard", "adaptive"],
+                       help=f"botocore retry mode (default {CLIENT_SETTINGS['retry_mode']})")
+    group.add_argument("--max-attempts", type=int,
+                       help=f"attempts per request (default {CLIENT_SETTINGS['max_attempts']})")
+    group.add_argument("--connect-timeout", type=float,
+                       help=f"seconds (default {CLIENT_SETTINGS['connect_timeout']})")
+    group.add_argument("--read-timeout", type=float,
+                       help=f"seconds (default {CLIENT_SETTINGS['read_timeout']})")
+
+
+def configure_clients_from_args(args):
+    """
+    This function applies the options added by add_client_options
+    param args: parsed argparse namespace
+    """
+    configure_clients(**{name: getattr(args, name, None) for name in CLIENT_SETTINGS})
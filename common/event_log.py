@@ -0,0 +1,67 @@
+"""
+Event logging shared by the assignment scripts
+Records are put on a queue and written by a background thread as JSON lines,
+so logging never waits on disk, and the log file is rotated by size instead
+of being truncated by whichever script starts next
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+LOG_FILE = "./event_log.txt"
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# names of LogRecord attributes that are not extra fields
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) \
+    | {"message", "asctime"}
+
+LISTENERS = []
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line
+    The operation defaults to the function that logged the record, and any
+    extra fields passed to the logging call (duration, bytes, ...) are added
+    """
+
+    def format(self, record):
+        entry = {"time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+                 "level": record.levelname,
+                 "operation": record.funcName,
+                 "message": record.getMessage()}
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(log_file=LOG_FILE, max_bytes=MAX_LOG_BYTES,
+                      backups=LOG_BACKUPS, level=logging.INFO):
+    """
+    This function routes the root logger through a queue to a rotating file
+    Calling it more than once in a process has no effect
+    param log_file: path of the log file
+    param max_bytes: size at which the log file is rotated
+    param backups: number of rotated files kept
+    param level: lowest level that is logged
+    """
+    if LISTENERS:
+        return
+    record_queue = queue.SimpleQueue()
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backups,
+        encoding="utf-8", delay=True)
+    file_handler.setFormatter(JsonLineFormatter())
+    listener = logging.handlers.QueueListener(record_queue, file_handler)
+    listener.start()
+    LISTENERS.append(listener)
+    atexit.register(listener.stop)
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(record_queue))
+    root.setLevel(level)
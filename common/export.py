@@ -0,0 +1,236 @@
+"""
+Full table exports shared by the assignment scripts
+A table is read with a parallel scan, one thread per segment, and every page is
+written out as soon as it arrives, so exports never hold the table in memory.
+"""
+import csv
+import gzip
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from common.clients import get_client, get_resource
+
+DEFAULT_SEGMENTS = 4
+EXPORT_FORMATS = ("jsonl", "csv")
+# pages waiting to be written per segment before the scans pause
+PAGES_PER_SEGMENT = 2
+SEGMENT_DONE = object()
+
+
+def json_default(value):
+    """
+    This function lets json write the Decimal numbers boto3 returns
+    param value: value json could not serialise
+    return: int or float
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def projection_request(projection):
+    """
+    This function builds the scan arguments that read only some attributes
+    Every name goes through ExpressionAttributeNames so reserved words work
+    param projection: list of attribute names, empty or None reads every attribute
+    return: dictionary of scan arguments
+    """
+    if not projection:
+        return {}
+    names = {f"#p{number}": name for number, name in enumerate(projection)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names
+    }
+
+
+def scan_segment(table_name, segment, total_segments, projection, pages, stop, region=None):
+    """
+    This function scans one segment of a table, following every page
+    param table_name: name of the table
+    param segment: number of this segment
+    param total_segments: number of segments the table is split into
+    param projection: list of attribute names, None reads every attribute
+    param pages: queue the item pages are put on
+    param stop: event set when the export is abandoned
+    param region: region of the table
+    """
+    table = get_resource("dynamodb", region).Table(table_name)
+    request = {"Segment": segment, "TotalSegments": total_segments}
+    request.update(projection_request(projection))
+    try:
+        while not stop.is_set():
+            response = table.scan(**request)
+            put_page(pages, response["Items"], stop)
+            if "LastEvaluatedKey" not in response:
+                break
+            request["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    except Exception as error:
+        put_page(pages, error, stop)
+    finally:
+        put_page(pages, SEGMENT_DONE, stop)
+
+
+def put_page(pages, page, stop):
+    """
+    This function waits for room on the page queue unless the export was abandoned
+    """
+    while not stop.is_set():
+        try:
+            pages.put(page, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def iter_table_items(table_name, segments=DEFAULT_SEGMENTS, projection=None, region=None):
+    """
+    This function reads every item of a table with a parallel scan
+    param table_name: name of the table
+    param segments: number of segments scanned at the same time
+    param projection: list of attribute names, None reads every attribute
+    param region: region of the table
+    return: generator of item pages, in the order they are read
+    """
+    segments = max(1, segments)
+    pages = queue.Queue(maxsize=segments * PAGES_PER_SEGMENT)
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        for segment in range(segments):
+            executor.submit(scan_segment, table_name, segment, segments,
+                            projection, pages, stop, region)
+        running = segments
+        try:
+            while running:
+                page = pages.get()
+                if page is SEGMENT_DONE:
+                    running -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stop.set()
+
+
+def open_export(path, compress=None):
+    """
+    This function opens an export file for writing
+    param path: path of the file
+    param compress: gzip the file, None decides from a .gz extension
+    return: text file object
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def export_format(path, file_format=None):
+    """
+    This function picks the export format from the file extension
+    param path: path of the file
+    param file_format: "jsonl" or "csv" to override the extension
+    return: "jsonl" or "csv"
+    """
+    if file_format:
+        return file_format
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+def export_table(table_name, path, file_format=None, segments=DEFAULT_SEGMENTS,
+                 projection=None, compress=None, region=None):
+    """
+    This function writes every item of a table to a json lines or csv file
+    Csv columns are the projection, or the attributes of the first item read
+    when there is no projection; attributes outside those columns are dropped
+    param table_name: name of the table
+    param path: path of the export file
+    param file_format: "jsonl" or "csv", picked from the extension by default
+    param segments: number of segments scanned at the same time
+    param projection: list of attribute names, None exports every attribute
+    param compress: gzip the file, None decides from a .gz extension
+    param region: region of the table
+    return: dictionary with Items, Pages and Seconds
+    """
+    file_format = export_format(path, file_format)
+    stats = {"Items": 0, "Pages": 0}
+    started = time.perf_counter()
+    with open_export(path, compress) as export_file:
+        writer = None
+        for page in iter_table_items(table_name, segments, projection, region):
+            stats["Pages"] += 1
+            for item in page:
+                if file_format == "csv":
+                    if writer is None:
+                        writer = csv.DictWriter(
+                            export_file, fieldnames=list(projection or sorted(item)),
+                            restval="", extrasaction="ignore")
+                        writer.writeheader()
+                    writer.writerow(item)
+                else:
+                    export_file.write(json.dumps(item, default=json_default) + "\n")
+                stats["Items"] += 1
+    stats["Seconds"] = time.perf_counter() - started
+    return stats
+
+
+def upload_export(path, bucket, key=None, region=None):
+    """
+    This function uploads an export file to s3
+    upload_file switches to a multipart upload for large exports
+    param path: path of the export file
+    param bucket: name of the bucket
+    param key: object key, defaults to the file name
+    param region: region of the bucket
+    return: object key
+    """
+    if key is None:
+        key = path.replace("\\", "/").rsplit("/", 1)[-1]
+    get_client("s3", region).upload_file(path, bucket, key)
+    return key
+
+
+def add_export_options(command, default_path):
+    """
+    This function adds the export options to a subcommand
+    param command: argparse subparser
+    param default_path: export file used when --output is not given
+    """
+    command.add_argument("--output", default=default_path,
+                         help="export file, a .gz extension gzips it")
+    command.add_argument("--format", choices=EXPORT_FORMATS,
+                         help="format of the export, picked from the extension by default")
+    command.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS,
+                         help="segments scanned in parallel")
+    command.add_argument("--attributes", nargs="+", metavar="NAME",
+                         help="only export these attributes")
+    command.add_argument("--gzip", action="store_true", default=None,
+                         help="gzip the export whatever its extension")
+    command.add_argument("--bucket", help="upload the export to this s3 bucket")
+    command.add_argument("--key", help="object key of the upload, defaults to the file name")
+
+
+def export_from_args(table_name, args, region=None):
+    """
+    This function runs an export described by the options from add_export_options
+    param table_name: name of the table
+    param args: parsed arguments
+    param region: region of the table
+    return: dictionary with Items, Pages, Seconds and the uploaded Key if any
+    """
+    stats = export_table(table_name, args.output, args.format, args.segments,
+                         args.attributes, args.gzip, region)
+    if args.bucket:
+        stats["Key"] = upload_export(args.output, args.bucket, args.key)
+    return stats
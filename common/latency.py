@@ -0,0 +1,146 @@
+"""
+Latency histograms shared by the assignment scripts
+Samples are counted in log scale buckets, eight per doubling, so memory use
+does not grow with the number of samples and percentiles are within about
+9% of the exact value.
+"""
+import json
+import math
+import threading
+
+BUCKETS_PER_DOUBLING = 8
+PERCENTILES = (50, 90, 95, 99)
+# bucket of zero and negative samples, below every other bucket
+ZERO_BUCKET = -(2 ** 31)
+
+
+def bucket_index(value):
+    """
+    This function returns the histogram bucket a sample falls in
+    param value: sample, zero and negative samples share the lowest bucket
+    return: bucket number, bucket n holds samples up to 2 ** (n / BUCKETS_PER_DOUBLING)
+    """
+    if value <= 0:
+        return ZERO_BUCKET
+    return math.ceil(math.log2(value) * BUCKETS_PER_DOUBLING)
+
+
+def bucket_limit(index):
+    """
+    param index: bucket number from bucket_index
+    return: largest sample the bucket holds
+    """
+    return 0.0 if index == ZERO_BUCKET else 2 ** (index / BUCKETS_PER_DOUBLING)
+
+
+class Histogram:
+    """
+    Log scale histogram of one metric with count, sum, min and max
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        """
+        param value: sample to count
+        """
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def percentile(self, percent):
+        """
+        param percent: percentile to estimate, 0 to 100
+        return: upper limit of the bucket holding the percentile, None without samples
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(bucket_limit(index), self.minimum), self.maximum)
+        return self.maximum
+
+    def summary(self):
+        """
+        return: dictionary with count, mean, min, max, percentiles and bucket counts
+        """
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}"] = self.percentile(percent)
+        summary["buckets"] = [
+            [bucket_limit(index), count]
+            for index, count in sorted(self.buckets.items())
+        ]
+        return summary
+
+
+class LatencyRecorder:
+    """
+    Histograms of several metrics for several names, e.g. per function,
+    plus plain counters such as cold starts; safe to use from many threads
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, metric, value):
+        """
+        param name: what was measured, e.g. a function name
+        param metric: which measurement, e.g. "duration_ms"
+        param value: sample to count, None is ignored
+        """
+        if value is None:
+            return
+        with self.lock:
+            histogram = self.histograms.setdefault(name, {}).setdefault(metric, Histogram())
+            histogram.add(value)
+
+    def count(self, name, counter, amount=1):
+        """
+        param name: what was measured, e.g. a function name
+        param counter: what is being counted, e.g. "cold_starts"
+        param amount: number to add
+        """
+        with self.lock:
+            counters = self.counters.setdefault(name, {})
+            counters[counter] = counters.get(counter, 0) + amount
+
+    def summary(self):
+        """
+        return: dictionary of name to counters and metric summaries
+        """
+        with self.lock:
+            return {
+                name: {
+                    "counters": dict(self.counters.get(name, {})),
+                    "metrics": {metric: histogram.summary()
+                                for metric, histogram in metrics.items()},
+                }
+                for name, metrics in self.histograms.items()
+            }
+
+    def save(self, path):
+        """
+        This function writes the summary to a json file
+        param path: path of the file
+        """
+        with open(path, "w", encoding="utf-8") as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
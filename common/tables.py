@@ -0,0 +1,59 @@
+"""
+DynamoDB table status checks shared by the assignment scripts
+A table is checked with a single describe_table call instead of listing every
+table in the account, and the answer is kept for the rest of the process.
+Scripts record their own creates and deletes with set_table_status.
+"""
+import threading
+
+MISSING = "MISSING"
+# states that change on their own are looked up again instead of cached
+TRANSITIONAL_STATES = {"CREATING", "UPDATING", "DELETING"}
+
+TABLE_STATUS = {}
+TABLE_STATUS_LOCK = threading.Lock()
+
+
+def table_status(db_client, table_name):
+    """
+    This function returns the status of a table
+    param db_client: boto3 dynamodb client object
+    param table_name: name of the table
+    return: "ACTIVE", "CREATING", "UPDATING", "DELETING", ... or MISSING
+    """
+    with TABLE_STATUS_LOCK:
+        if table_name in TABLE_STATUS:
+            return TABLE_STATUS[table_name]
+    try:
+        status = db_client.describe_table(TableName=table_name)["Table"]["TableStatus"]
+    except Exception as error:
+        if getattr(error, "response", {}).get("Error", {}).get("Code") \
+                != "ResourceNotFoundException":
+            raise
+        status = MISSING
+    if status not in TRANSITIONAL_STATES:
+        set_table_status(table_name, status)
+    return status
+
+
+def table_exists(db_client, table_name):
+    """
+    This function checks if a table exists, including tables still being created
+    param db_client: boto3 dynamodb client object
+    param table_name: name of the table
+    return: true if the table exists
+    """
+    return table_status(db_client, table_name) != MISSING
+
+
+def set_table_status(table_name, status=None):
+    """
+    This function records a table's status after this process changes it
+    param table_name: name of the table
+    param status: new status, None forgets the table so it is described again
+    """
+    with TABLE_STATUS_LOCK:
+        if status is None:
+            TABLE_STATUS.pop(table_name, None)
+        else:
+            TABLE_STATUS[table_name] = status
@@ -0,0 +1,265 @@
+"""
+Write pacing for provisioned DynamoDB tables shared by the assignment scripts
+Writes are spread out with a token bucket filled at the table's provisioned
+write capacity. The rate is halved when dynamodb throttles and creeps back up
+while writes succeed, and throttled writes are retried until they go through.
+Server errors and dropped connections are retried a few times as well.
+"""
+import json
+import math
+import random
+import threading
+import time
+
+THROTTLE_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+# server side errors worth another try, retried without slowing down
+TRANSIENT_CODES = {
+    "InternalServerError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+}
+# tries of a write that keeps failing with transient errors
+MAX_TRANSIENT_ATTEMPTS = 8
+# share of the provisioned capacity the scheduler aims for
+DEFAULT_UTILIZATION = 0.9
+# the rate never drops below this share of the provisioned capacity
+MIN_RATE_SHARE = 0.1
+# share of the provisioned capacity added back after each successful write
+RECOVERY_SHARE = 0.05
+MAX_BACKOFF = 20.0
+# largest exponent of the backoff, 2 ** 16 is far past MAX_BACKOFF already
+MAX_BACKOFF_EXPONENT = 16
+# settings for the clients that make paced writes: botocore gives up after one
+# retry so throttling and transient errors reach the scheduler, which retries
+# them with its own backoff and slows down for throttling
+PACED_CLIENT_SETTINGS = {"retry_mode": "standard", "max_attempts": 2}
+
+SCHEDULERS = {}
+SCHEDULERS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket that can be drawn into debt
+    A caller takes its tokens straight away and sleeps until the bucket would
+    have held them, so concurrent callers queue up in the order they arrived
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        """
+        adds the tokens earned since the last call, the lock must be held
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """
+        param tokens: number of tokens to take
+        return: seconds spent waiting
+        """
+        with self.lock:
+            self.refill()
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def set_rate(self, rate):
+        """
+        param rate: tokens added per second from now on
+        """
+        with self.lock:
+            self.refill()
+            self.rate = rate
+            self.capacity = rate
+
+
+def is_throttled(error):
+    """
+    This function checks if an exception is dynamodb throttling a request
+    param error: exception raised by a boto3 call
+    return: true if the request should be retried later
+    """
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLE_CODES
+
+
+def connection_errors():
+    """
+    This function returns the exceptions raised when a request never got an answer
+    botocore is imported on first use, like common.clients.client_error
+    return: tuple of exception classes
+    """
+    errors = (ConnectionError, TimeoutError)
+    try:
+        from botocore.exceptions import ConnectionError as BotocoreConnectionError
+        from botocore.exceptions import HTTPClientError
+    except ImportError:
+        return errors
+    return errors + (BotocoreConnectionError, HTTPClientError)
+
+
+def is_transient(error):
+    """
+    This function checks if an exception is a server error or lost connection
+    param error: exception raised by a boto3 call
+    return: true if the same request may well succeed when sent again
+    """
+    if isinstance(error, connection_errors()):
+        return True
+    response = getattr(error, "response", {})
+    if response.get("Error", {}).get("Code") in TRANSIENT_CODES:
+        return True
+    return response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500
+
+
+def item_write_units(item):
+    """
+    This function estimates the write capacity units an item costs
+    One unit covers each started kilobyte of the item
+    param item: item dictionary
+    return: write capacity units
+    """
+    size = len(json.dumps(item, default=str).encode("utf-8"))
+    return max(1, math.ceil(size / 1024))
+
+
+def backoff_delay(attempt):
+    """
+    This function returns a jittered exponential backoff delay
+    param attempt: number of retries so far
+    return: seconds to sleep
+    """
+    return random.uniform(0, min(MAX_BACKOFF, 0.05 * 2 ** min(attempt, MAX_BACKOFF_EXPONENT)))
+
+
+class WriteScheduler:
+    """
+    Paces the writes to one table so they stay under its provisioned capacity
+    Tables billed per request have no capacity to read, their writes are not
+    paced but throttled writes are still retried
+    """
+
+    def __init__(self, write_capacity, utilization=DEFAULT_UTILIZATION):
+        self.provisioned = write_capacity
+        self.utilization = utilization
+        self.bucket = None
+        if write_capacity:
+            self.bucket = TokenBucket(write_capacity * utilization)
+        self.lock = threading.Lock()
+        self.throttles = 0
+        self.waited = 0.0
+
+    def acquire(self, units=1):
+        """
+        waits until units write capacity units can be used
+        param units: write capacity units about to be used
+        """
+        if self.bucket is not None:
+            waited = self.bucket.acquire(units)
+            with self.lock:
+                self.waited += waited
+
+    def throttled(self):
+        """
+        halves the write rate after dynamodb throttled a write
+        """
+        with self.lock:
+            self.throttles += 1
+            if self.bucket is not None:
+                self.bucket.set_rate(max(self.provisioned * MIN_RATE_SHARE,
+                                         self.bucket.rate / 2))
+
+    def succeeded(self):
+        """
+        raises the write rate back towards the target after a write went through
+        """
+        if self.bucket is None:
+            return
+        with self.lock:
+            target = self.provisioned * self.utilization
+            if self.bucket.rate < target:
+                self.bucket.set_rate(min(target, self.bucket.rate
+                                         + self.provisioned * RECOVERY_SHARE))
+
+    def call(self, function, units=1):
+        """
+        runs a write, retrying for as long as dynamodb throttles it and up to
+        MAX_TRANSIENT_ATTEMPTS times while it fails with transient errors
+        param function: function making the write
+        param units: write capacity units the write uses
+        return: return value of function
+        """
+        attempt = 0
+        transient_attempts = 0
+        while True:
+            self.acquire(units)
+            try:
+                result = function()
+            except Exception as error:
+                if is_throttled(error):
+                    self.throttled()
+                elif is_transient(error) and transient_attempts + 1 < MAX_TRANSIENT_ATTEMPTS:
+                    transient_attempts += 1
+                else:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            self.succeeded()
+            return result
+
+    def stats(self):
+        """
+        return: dictionary with the current rate, throttle count and seconds spent waiting
+        """
+        with self.lock:
+            return {
+                "rate": self.bucket.rate if self.bucket is not None else None,
+                "throttles": self.throttles,
+                "waited": self.waited,
+            }
+
+
+def provisioned_write_capacity(db_client, table_name):
+    """
+    This function reads the provisioned write capacity of a table
+    param db_client: boto3 dynamodb client object
+    param table_name: name of the table
+    return: write capacity units, or 0 for tables billed per request
+    """
+    table = db_client.describe_table(TableName=table_name)["Table"]
+    if table.get("BillingModeSummary", {}).get("BillingMode") == "PAY_PER_REQUEST":
+        return 0
+    return table.get("ProvisionedThroughput", {}).get("WriteCapacityUnits", 0)
+
+
+def write_scheduler(db_client, table_name, utilization=DEFAULT_UTILIZATION):
+    """
+    This function returns the write scheduler of a table, shared by every thread
+    param db_client: boto3 dynamodb client object
+    param table_name: name of the table
+    param utilization: share of the provisioned capacity to aim for
+    return: WriteScheduler
+    """
+    with SCHEDULERS_LOCK:
+        if table_name not in SCHEDULERS:
+            SCHEDULERS[table_name] = WriteScheduler(
+                provisioned_write_capacity(db_client, table_name), utilization)
+        return SCHEDULERS[table_name]
@@ -0,0 +1,52 @@
+"""
+Shared fixtures for the assignment script tests
+The scripts are loaded from their files, since they are not installed as
+packages; AWS clients are replaced by small fakes, boto3 is never imported.
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_script(folder, name):
+    """
+    loads an assignment script as a fresh module
+    """
+    spec = importlib.util.spec_from_file_location(
+        f"{name.lower()}_under_test", os.path.join(ROOT, folder, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def assignment1(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return load_script("assignment1", "Assignment1")
+
+
+@pytest.fixture
+def assignment2(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return load_script("assignment2", "Assignment2")
+
+
+@pytest.fixture
+def assignment3(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return load_script("assignment3", "Assignment3")
+
+
+class FakeClientError(Exception):
+    """
+    Exception shaped like botocore's ClientError
+    """
+
+    def __init__(self, code, message=""):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
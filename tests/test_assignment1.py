@@ -0,0 +1,48 @@
+class FakeCopyClient:
+    """
+    s3 client recording the multipart copy calls
+    """
+
+    def __init__(self, head):
+        self.head = head
+        self.created = None
+        self.completed = None
+
+    def head_object(self, Bucket, Key, IfMatch=None):
+        return dict(self.head, ContentLength=3 * 1024 ** 3, ETag=IfMatch)
+
+    def create_multipart_upload(self, **request):
+        self.created = request
+        return {"UploadId": "upload"}
+
+    def upload_part_copy(self, PartNumber, **request):
+        return {"CopyPartResult": {"ETag": f"part-{PartNumber}"}}
+
+    def complete_multipart_upload(self, **request):
+        self.completed = request
+
+    def abort_multipart_upload(self, **request):
+        raise AssertionError("copy was aborted")
+
+
+def test_multipart_copy_keeps_object_metadata(assignment1):
+    head = {
+        "ContentType": "application/zip",
+        "CacheControl": "max-age=3600",
+        "ContentEncoding": "gzip",
+        "Metadata": {"owner": "sdev400"},
+        "ServerSideEncryption": "aws:kms",
+        "SSEKMSKeyId": "key-id",
+        "StorageClass": "STANDARD_IA",
+    }
+    client = FakeCopyClient(head)
+    source = {"Key": "archive.zip", "Size": 3 * 1024 ** 3, "ETag": '"etag"'}
+
+    copied = assignment1.copy_bucket_object(client, "origin", source, "destination")
+
+    assert copied == source["Size"]
+    assert client.completed is not None
+    assert client.created["Bucket"] == "destination"
+    assert client.created["Key"] == "archive.zip"
+    for field, value in head.items():
+        assert client.created[field] == value
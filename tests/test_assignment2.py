@@ -0,0 +1,66 @@
+from common.throttle import WriteScheduler
+from conftest import FakeClientError
+
+
+def course(course_id, title):
+    return {"Subject": "CMIS", "CatalogNbr": str(course_id), "Title": title,
+            "Credits": "3", "CourseId": str(course_id)}
+
+
+class FakeBatchResource:
+    """
+    batch_write_item that rejects batches with repeated keys, like dynamodb
+    """
+
+    def __init__(self):
+        self.items = {}
+
+    def batch_write_item(self, RequestItems):
+        for table_name, requests in RequestItems.items():
+            keys = [request["PutRequest"]["Item"]["CourseID"] for request in requests]
+            if len(keys) != len(set(keys)):
+                raise FakeClientError("ValidationException",
+                                      "Provided list of item keys contains duplicates")
+            for request in requests:
+                item = request["PutRequest"]["Item"]
+                self.items[item["CourseID"]] = item
+        return {}
+
+
+def test_bulk_load_replaces_duplicate_keys_in_one_batch(assignment2, monkeypatch):
+    resource = FakeBatchResource()
+    monkeypatch.setattr(assignment2, "get_write_resource", lambda: resource)
+    scheduler = WriteScheduler(0)
+    monkeypatch.setattr(assignment2, "course_scheduler", lambda table_name: scheduler)
+
+    records = [course(number, f"Course {number}") for number in range(1, 11)]
+    records.insert(5, course(3, "Replaced title"))
+
+    stats = assignment2.bulk_load("Courses", records, writers=1)
+
+    assert stats["Written"] == 10
+    assert stats["Replaced"] == 1
+    assert stats["Failed"] == 0
+    assert len(resource.items) == 10
+    assert resource.items[3]["Title"] == "Replaced title"
+
+
+class FakeDeleteClient:
+    def delete_table(self, TableName):
+        self.deleted = TableName
+
+
+def test_delete_table_drops_cached_titles(assignment2, monkeypatch, tmp_path):
+    cache_file = str(tmp_path / "titles.json")
+    assignment2.use_title_cache_file(cache_file)
+    assignment2.TITLE_CACHE.put(("CMIS", "141"), "Introductory Programming")
+    assignment2.TITLE_CACHE.save(cache_file)
+    monkeypatch.setattr(assignment2, "table_exists", lambda table_name: True)
+    monkeypatch.setattr(assignment2, "get_db_client", FakeDeleteClient)
+    monkeypatch.setattr(assignment2, "set_table_status", lambda *args: None)
+    monkeypatch.setattr(assignment2, "wait_for_table", lambda *args, **kwargs: None)
+
+    assignment2.delete_table("Courses")
+
+    assert assignment2.TITLE_CACHE.get(("CMIS", "141")) is None
+    assert not (tmp_path / "titles.json").exists()
@@ -0,0 +1,12 @@
+def test_auto_backend_caches_under_the_chosen_backend(assignment3):
+    assignment3.use_result_cache(None)
+    assignment3.use_backend("auto")
+    payload = {"num1": 2, "num2": 3}
+
+    result = assignment3.invoke_function("lambda_addition", payload)
+
+    cache = assignment3.RESULT_CACHES[0]
+    local_key = assignment3.result_key("local", "lambda_addition", payload)
+    auto_key = assignment3.result_key("auto", "lambda_addition", payload)
+    assert cache.get(local_key) == (result,)
+    assert cache.get(auto_key) is None
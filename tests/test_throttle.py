@@ -0,0 +1,45 @@
+from common import throttle
+from common.throttle import MAX_BACKOFF, WriteScheduler, backoff_delay
+from conftest import FakeClientError
+
+
+def failing_then(errors, result="written"):
+    """
+    returns a write that raises each error in turn, then returns result
+    """
+    remaining = list(errors)
+
+    def write():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    return write
+
+
+def test_call_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(throttle.time, "sleep", lambda seconds: None)
+    scheduler = WriteScheduler(0)
+    write = failing_then([FakeClientError("InternalServerError"),
+                          FakeClientError("ProvisionedThroughputExceededException"),
+                          ConnectionResetError("connection reset by peer")])
+
+    assert scheduler.call(write) == "written"
+    assert scheduler.stats()["throttles"] == 1
+
+
+def test_call_gives_up_on_lasting_transient_errors(monkeypatch):
+    monkeypatch.setattr(throttle.time, "sleep", lambda seconds: None)
+    error = FakeClientError("ServiceUnavailable")
+    write = failing_then([error] * throttle.MAX_TRANSIENT_ATTEMPTS)
+
+    try:
+        WriteScheduler(0).call(write)
+    except FakeClientError as raised:
+        assert raised is error
+    else:
+        raise AssertionError("the write should have failed")
+
+
+def test_backoff_delay_is_capped_for_large_attempts():
+    for attempt in (0, 16, 1024, 10 ** 6):
+        assert 0 <= backoff_delay(attempt) <= MAX_BACKOFF